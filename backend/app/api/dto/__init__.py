@@ -1,51 +1,48 @@
-"""DTO (Data Transfer Object) module."""
-from .base import (
-    BaseDTO,
-    TimestampedDTO,
-    SessionStatus,
-    CodeBlockType,
-)
-
-# Export all DTOs for easy access
-from .sessions import (
-    SessionBase,
-    CreateSessionInput,
-    CreateSessionOutput,
-    GetSessionOutput,
-    UpdateSessionInput,
-    SessionStatusResponse,
-    SessionListOutput,
-)
-
-from .code_blocks import (
-    CodeBlockBase,
-)
-
-from .analyses import (
-    AnalysisBase,
-    AnalysisDetail,
-)
-
-__all__ = [
+"""DTO (Data Transfer Object) module.
+
+DTOs are resolved lazily on first attribute access (PEP 562), so importing
+this package only builds the Pydantic schemas that are actually used.
+"""
+from importlib import import_module
+
+# Export all DTOs for easy access: name -> defining module
+_LAZY = {
     # Base
-    "BaseDTO",
-    "TimestampedDTO",
-    "SessionStatus",
-    "CodeBlockType",
-    
+    "BaseDTO": "app.api.dto.base",
+    "TimestampedDTO": "app.api.dto.base",
+    "SessionStatus": "app.api.dto.base",
+    "CodeBlockType": "app.api.dto.base",
+
     # Sessions
-    "SessionBase",
-    "CreateSessionInput",
-    "CreateSessionOutput",
-    "GetSessionOutput",
-    "UpdateSessionInput",
-    "SessionStatusResponse",
-    "SessionListOutput",
-    
+    "SessionBase": "app.api.dto.sessions.session_base",
+    "CreateSessionInput": "app.api.dto.sessions.create_session_input",
+    "CreateSessionOutput": "app.api.dto.sessions.create_session_output",
+    "GetSessionOutput": "app.api.dto.sessions.get_session_output",
+    "UpdateSessionInput": "app.api.dto.sessions.update_session_input",
+    "SessionStatusResponse": "app.api.dto.sessions.session_status_response",
+    "SessionListOutput": "app.api.dto.sessions.session_list_output",
+
     # CodeBlocks
-    "CodeBlockBase",
-    
+    "CodeBlockBase": "app.api.dto.code_blocks.code_block_base",
+
     # Analyses
-    "AnalysisBase",
-    "AnalysisDetail",
-]
+    "AnalysisBase": "app.api.dto.analyses.analysis_base",
+    "AnalysisDetail": "app.api.dto.analyses.analysis_detail",
+}
+
+__all__ = list(_LAZY)
+
+
+def __getattr__(name):
+    try:
+        module_path = _LAZY[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    value = getattr(import_module(module_path), name)
+    # Cache on the package so later lookups skip __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
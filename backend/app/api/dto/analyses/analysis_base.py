@@ -1,28 +1,46 @@
 """Analysis base DTO."""
 from ..base import BaseDTO, CodeBlockType
 from ..code_blocks.code_block_base import CodeBlockBase
-from typing import Optional
+from pydantic import ConfigDict
+from typing_extensions import TypedDict
+
+class LlmCallMetadata(TypedDict, total=False):
+    """Metadata recorded for a single LLM call."""
+    __pydantic_config__ = ConfigDict(extra='allow')
+    
+    tokens_used: int
+    model: str
+    has_response: bool
+    disabled: bool
+    reason: str
+
+class LlmMetadata(TypedDict, total=False):
+    """LLM metadata stored on an analysis, one entry per pipeline stage."""
+    __pydantic_config__ = ConfigDict(extra='allow')
+    
+    vulnerability_analysis: LlmCallMetadata
+    remediation: LlmCallMetadata
 
 class AnalysisBase(BaseDTO):
     """Analysis DTO."""
     session_id: str
     code_block_id: str
     code_block_type: CodeBlockType
-    suggested_replacement: Optional[CodeBlockBase] = None  # CodeBlock DTO, not string
+    suggested_replacement: CodeBlockBase | None = None  # CodeBlock DTO, not string
     
     # Enhanced LLM analysis fields
-    cwe_id: Optional[str] = None
-    owasp_category: Optional[str] = None
-    risk_level: Optional[str] = None  # "low", "medium", "high", "critical"
-    confidence_score: Optional[float] = None
+    cwe_id: str | None = None
+    owasp_category: str | None = None
+    risk_level: str | None = None  # "low", "medium", "high", "critical"
+    confidence_score: float | None = None
     
     # Detailed descriptions
-    vulnerability_description: Optional[str] = None
-    exploitation_scenario: Optional[str] = None
-    remediation_explanation: Optional[str] = None
+    vulnerability_description: str | None = None
+    exploitation_scenario: str | None = None
+    remediation_explanation: str | None = None
     
     # Diff between original and remediated code
-    diff: Optional[str] = None
+    diff: str | None = None
     
     # LLM metadata
-    llm_metadata: Optional[dict] = None
+    llm_metadata: LlmMetadata | None = None
@@ -1,11 +1,15 @@
 """Base DTO classes and shared types."""
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from datetime import datetime
-from typing import Optional
 from enum import Enum
 
+# Shared by every response DTO through BaseDTO
+DTO_CONFIG = ConfigDict(from_attributes=True, extra='ignore', frozen=True)
+
 class BaseDTO(BaseModel):
     """Base DTO with common fields."""
+    model_config = DTO_CONFIG
+    
     id: str
     created_at: datetime
 
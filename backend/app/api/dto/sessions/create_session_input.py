@@ -1,14 +1,16 @@
 """Create session input DTO."""
 from pydantic import BaseModel, model_validator
-from typing import Optional
 
 class CreateSessionInput(BaseModel):
     """Input for POST /sessions."""
-    orig_location: Optional[str] = None  # Git URL
-    code: Optional[str] = None  # Raw code content
+    orig_location: str | None = None  # Git URL
+    code: str | None = None  # Raw code content
     
-    @model_validator(mode='after')
-    def validate_at_least_one_provided(self):
-        if not self.orig_location and not self.code:
+    @model_validator(mode='before')
+    @classmethod
+    def validate_at_least_one_provided(cls, data):
+        # Checked on the raw payload so the request is rejected before any
+        # field validation runs
+        if isinstance(data, dict) and not (data.get('orig_location') or data.get('code')):
             raise ValueError('Either orig_location or code must be provided')
-        return self
+        return data
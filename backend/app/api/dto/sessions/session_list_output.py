@@ -1,13 +1,17 @@
 """Session list output DTO."""
+from pydantic import ConfigDict
 from ..base import TimestampedDTO, SessionStatus
 from datetime import datetime
-from typing import Optional
 
 class SessionListOutput(TimestampedDTO):
     """Output for GET /sessions (list of sessions)."""
+    # Merged into the inherited DTO_CONFIG; off the hot path, so the core
+    # schema is built on first use
+    model_config = ConfigDict(defer_build=True)
+    
     status: SessionStatus
     progress: int
-    completed_at: Optional[datetime] = None
-    error_message: Optional[str] = None
+    completed_at: datetime | None = None
+    error_message: str | None = None
     # Add analysis count for quick overview
     analysis_count: int = 0
@@ -1,11 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Optional
-from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
+import orjson
+from pydantic import TypeAdapter
+from sqlalchemy import or_, select, update
+from sqlalchemy.ext.asyncio import AsyncResult, AsyncSession
+from typing import AsyncIterator, List, Optional
 
-from app.database import get_db
-from app.models.session import SessionStatus as ModelSessionStatus
-from app.models.analysis import Analysis
+from app.database import get_db, get_db_ro
+from app.queue import get_analysis_queue
+from app.status_cache import get_status_cache
+from app.models.session import Session, SessionStatus as ModelSessionStatus
+from app.models.analysis import Analysis, CodeBlockType as ModelCodeBlockType
 from app.api.dto import (
     CreateSessionInput,
     CreateSessionOutput,
@@ -15,16 +20,135 @@ from app.api.dto import (
     SessionListOutput,
     SessionStatus as DTOSessionStatus,
     CodeBlockType,
-    AnalysisDetail,
     CodeBlockBase,
+    AnalysisDetail,
 )
 from app.services.session_service import SessionService
 from app.services.diff_generator import DiffGenerator
+from app.services.unsafe_scan import scan_unsafe_blocks
+from app.config.llm_config import llm_config
+from app.utils.clock import utcnow
 
 router = APIRouter()
 
+# Built once at import; reused to serialize every GET /sessions/{id} response
+_GET_SESSION_ADAPTER = TypeAdapter(GetSessionOutput)
+
+# Model <-> DTO enum lookups keyed by member, avoiding Enum construction per row
+_DTO_STATUS_BY_MODEL = {m: DTOSessionStatus(m.value) for m in ModelSessionStatus}
+_MODEL_STATUS_BY_DTO = {d: m for m, d in _DTO_STATUS_BY_MODEL.items()}
+_DTO_CODE_BLOCK_TYPE_BY_MODEL = {m: CodeBlockType(m.value) for m in ModelCodeBlockType}
+
+# Uploads up to this size are scanned inline by POST /sessions when the LLM
+# is disabled, instead of going through the analysis queue
+INLINE_ANALYSIS_MAX_CHARS = 4096
+
+# Statuses that stamp completed_at when a session enters them
+_TERMINAL_STATUSES = frozenset({DTOSessionStatus.COMPLETED, DTOSessionStatus.FAILED})
+
+def _analysis_detail(analysis: Analysis) -> AnalysisDetail:
+    """Build an AnalysisDetail from an Analysis row and its code block.
+    
+    Rows come straight from the database, so the DTOs are assembled with
+    model_construct and skip validation.
+    """
+    # Build CodeBlockBase from database CodeBlock
+    db_code_block = analysis.code_block
+    if db_code_block is None:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Analysis {analysis.id} has no associated code block"
+        )
+    
+    code_block = CodeBlockBase.model_construct(
+        id=db_code_block.id,
+        created_at=db_code_block.created_at,
+        raw_code=db_code_block.raw_code,
+        line_start=db_code_block.line_start,
+        line_end=db_code_block.line_end,
+        file_path=db_code_block.file_path,
+    )
+    
+    # Build suggested_replacement CodeBlockBase if exists
+    suggested_replacement = None
+    diff_text = None
+    if analysis.suggested_replacement is not None:
+        # For now, suggested_replacement is stored as text in database
+        # We need to create a minimal CodeBlockBase for it
+        # In future, we might store it as proper CodeBlock
+        suggested_replacement = CodeBlockBase.model_construct(
+            id=analysis.suggested_replacement_id,
+            created_at=analysis.created_at,
+            raw_code=analysis.suggested_replacement,
+            line_start=0,
+            line_end=0,
+            file_path=None,
+        )
+        
+        # Generate diff between original and remediation code
+        original_code = code_block.raw_code
+        fixed_code = analysis.suggested_replacement
+        diff_text = DiffGenerator.generate_unified_diff(
+            original_code,
+            fixed_code,
+            original_label="vulnerable_code",
+            fixed_label="remediated_code"
+        )
+    
+    # Get risk level as string if exists
+    risk_level_str = None
+    if analysis.risk_level is not None:
+        risk_level_str = analysis.risk_level.value
+    
+    return AnalysisDetail.model_construct(
+        id=analysis.id,
+        created_at=analysis.created_at,
+        session_id=analysis.session_id,
+        code_block_id=analysis.code_block_id,
+        code_block_type=_DTO_CODE_BLOCK_TYPE_BY_MODEL[analysis.code_block_type],
+        suggested_replacement=suggested_replacement,
+        code_block=code_block,
+        # Enhanced fields
+        cwe_id=analysis.cwe_id,
+        owasp_category=analysis.owasp_category,
+        risk_level=risk_level_str,
+        confidence_score=analysis.confidence_score,
+        vulnerability_description=analysis.vulnerability_description,
+        exploitation_scenario=analysis.exploitation_scenario,
+        remediation_explanation=analysis.remediation_explanation,
+        diff=diff_text,
+        llm_metadata=analysis.llm_metadata,
+    )
+
+def _session_list_row(session: Session, analysis_count: int) -> dict:
+    """Build the SessionListOutput payload for one listed session."""
+    return SessionListOutput.model_construct(
+        id=session.id,
+        status=_DTO_STATUS_BY_MODEL[session.status],
+        progress=session.progress,
+        created_at=session.created_at,
+        updated_at=session.updated_at,
+        completed_at=session.completed_at,
+        error_message=session.error_message,
+        analysis_count=analysis_count
+    ).model_dump()
+
+async def _stream_session_list(result: AsyncResult) -> AsyncIterator[bytes]:
+    """Encode streamed (session, count) rows as a JSON array, one batch per chunk.
+    
+    orjson handles datetimes and str enums natively, so each row dict is
+    encoded directly without jsonable_encoder.
+    """
+    yield b"["
+    first = True
+    async for partition in result.tuples().partitions():
+        chunk = b",".join(orjson.dumps(_session_list_row(*row)) for row in partition)
+        yield chunk if first else b"," + chunk
+        first = False
+    yield b"]"
+
 @router.get("/sessions", 
-            response_model=List[SessionListOutput],
+            responses={200: {"model": List[SessionListOutput]}},
             summary="List analysis sessions",
             description="""List all analysis sessions with optional filtering.
             
@@ -45,7 +169,7 @@ async def list_sessions(
     skip: int = 0,
     limit: int = 100,
     status_filter: Optional[DTOSessionStatus] = None,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db_ro)
 ):
     """List analysis sessions with optional filtering."""
     # Validate limit
@@ -60,54 +184,22 @@ async def list_sessions(
     # Convert DTO status to model status if provided
     model_status = None
     if status_filter:
-        model_status = ModelSessionStatus(status_filter.value)
+        model_status = _MODEL_STATUS_BY_DTO[status_filter]
     
-    # Get sessions from database
-    sessions = await session_service.list_sessions(
+    # Stream sessions and their analysis counts from one query
+    result = await session_service.stream_sessions_with_counts(
         skip=skip,
         limit=limit,
         status=model_status
     )
     
-    # Convert to DTOs with analysis counts
-    from sqlalchemy import select, func
-    session_outputs = []
-    
-    for session in sessions:
-        # Get analysis count for this session
-        result = await db.execute(
-            select(func.count(Analysis.id)).where(Analysis.session_id == session.id)
-        )
-        analysis_count = result.scalar() or 0
-        
-        # Use SQLAlchemy inspect to get actual attribute values with proper typing
-        from sqlalchemy import inspect
-        session_insp = inspect(session)
-        
-        session_id = session_insp.attrs.id.value
-        status_value = DTOSessionStatus(session_insp.attrs.status.value.value)
-        progress_value = session_insp.attrs.progress.value
-        created_at_value = session_insp.attrs.created_at.value
-        updated_at_value = session_insp.attrs.updated_at.value
-        completed_at_value = session_insp.attrs.completed_at.value
-        error_message_value = session_insp.attrs.error_message.value
-        
-        session_output = SessionListOutput(
-            id=session_id,
-            status=status_value,
-            progress=progress_value,
-            created_at=created_at_value,
-            updated_at=updated_at_value,
-            completed_at=completed_at_value,
-            error_message=error_message_value,
-            analysis_count=analysis_count
-        )
-        session_outputs.append(session_output)
-    
-    return session_outputs
+    return StreamingResponse(
+        _stream_session_list(result),
+        media_type="application/json"
+    )
 
 @router.post("/sessions", 
-             response_model=CreateSessionOutput, 
+             responses={202: {"model": CreateSessionOutput}},
              status_code=status.HTTP_202_ACCEPTED,
              summary="Create analysis session",
              description="""Submit Rust code or a Git repository URL for security analysis.
@@ -119,7 +211,8 @@ You must provide **either**:
 
 ## Response
 Returns session ID and initial status. Analysis is processed asynchronously.
-Check status via `/sessions/{id}/status` endpoint.
+Check status via `/sessions/{id}/status` endpoint. Small uploads may already
+be `completed` when the response is returned.
 
 ## Notes
 - Git repository analysis is not yet implemented (returns NotImplementedError)
@@ -131,39 +224,40 @@ async def create_session(
 ):
     """Create a new analysis session for Rust code security analysis."""
     try:
-        # Create session in database
+        code = session_data.code
         session_service = SessionService(db)
-        session = await session_service.create_session(
-            orig_location=session_data.orig_location,
-            code=session_data.code
-        )
-        
-        # Enqueue for processing
-        from app.main import get_analysis_queue  # Import here to avoid circular import
-        queue = get_analysis_queue()
-        await queue.put(session.id)
-        
-        # Use SQLAlchemy inspect to get actual attribute values with proper typing
-        from sqlalchemy import inspect
-        insp = inspect(session)
         
-        # Get attribute values using inspect which returns the actual Python values
-        session_id = insp.attrs.id.value
-        status_value = insp.attrs.status.value.value  # status is an enum, need .value
-        progress_value = insp.attrs.progress.value
-        created_at_value = insp.attrs.created_at.value
-        updated_at_value = insp.attrs.updated_at.value
-        completed_at_value = insp.attrs.completed_at.value
-        error_message_value = insp.attrs.error_message.value
+        if code and not llm_config.enabled and len(code) <= INLINE_ANALYSIS_MAX_CHARS:
+            # Scanning a small upload takes microseconds; finish it here
+            # rather than paying for a queue hop and a second transaction
+            session = await session_service.create_session(
+                orig_location=session_data.orig_location,
+                code=code,
+                analyzed_blocks=scan_unsafe_blocks(code)
+            )
+        else:
+            # Create session in database
+            session = await session_service.create_session(
+                orig_location=session_data.orig_location,
+                code=code
+            )
+            
+            # Enqueue for processing; the queue is unbounded so this never
+            # blocks, and unprocessed sessions are re-enqueued at startup
+            get_analysis_queue().put_nowait(session.id)
         
-        return CreateSessionOutput(
-            id=session_id,
-            status=status_value,
-            progress=progress_value,
-            created_at=created_at_value,
-            updated_at=updated_at_value,
-            completed_at=completed_at_value,
-            error_message=error_message_value
+        session_output = CreateSessionOutput.model_construct(
+            id=session.id,
+            status=_DTO_STATUS_BY_MODEL[session.status],
+            progress=session.progress,
+            created_at=session.created_at,
+            updated_at=session.updated_at,
+            completed_at=session.completed_at,
+            error_message=session.error_message
+        )
+        return ORJSONResponse(
+            session_output.model_dump(),
+            status_code=status.HTTP_202_ACCEPTED
         )
         
     except ValueError as e:
@@ -178,7 +272,7 @@ async def create_session(
         )
 
 @router.get("/sessions/{session_id}", 
-            response_model=GetSessionOutput,
+            responses={200: {"model": GetSessionOutput}},
             summary="Get session with analysis results",
             description="""Retrieve complete session details including analysis results.
             
@@ -194,11 +288,12 @@ If analysis is still in progress, the `analyses` array may be empty.
 - `500 Internal Server Error`: Database or processing error""")
 async def get_session(
     session_id: str,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db_ro)
 ):
     """Get complete session details including analysis results."""
+    # Load the session together with its analyses and their code blocks
     session_service = SessionService(db)
-    session = await session_service.get_session(session_id)
+    session = await session_service.get_session(session_id, eager=True)
     
     if not session:
         raise HTTPException(
@@ -206,120 +301,28 @@ async def get_session(
             detail=f"Session {session_id} not found"
         )
     
-    # Build analysis details from database
-    analyses: List[AnalysisDetail] = []
-    
-    # Query analyses for this session with their code blocks
-    from sqlalchemy import select
-    from sqlalchemy.orm import selectinload
+    analyses = [_analysis_detail(analysis) for analysis in session.analyses]
     
-    # Get analyses with code_block relationship
-    result = await db.execute(
-        select(Analysis)
-        .where(Analysis.session_id == session_id)
-        .options(selectinload(Analysis.code_block))
+    session_output = GetSessionOutput.model_construct(
+        id=session.id,
+        status=_DTO_STATUS_BY_MODEL[session.status],
+        progress=session.progress,
+        created_at=session.created_at,
+        updated_at=session.updated_at,
+        completed_at=session.completed_at,
+        error_message=session.error_message,
+        analyses=analyses
     )
-    db_analyses = result.scalars().all()
-    
-    for analysis in db_analyses:
-        # Use SQLAlchemy inspect to get actual attribute values with proper typing
-        from sqlalchemy import inspect
-        analysis_insp = inspect(analysis)
-        
-        # Build CodeBlockBase from database CodeBlock
-        if analysis.code_block is None:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Analysis {analysis_insp.attrs.id.value} has no associated code block"
-            )
-        
-        code_block_insp = inspect(analysis.code_block)
-        code_block_dto = CodeBlockBase(
-            id=code_block_insp.attrs.id.value,
-            created_at=code_block_insp.attrs.created_at.value,
-            raw_code=code_block_insp.attrs.raw_code.value,
-            line_start=code_block_insp.attrs.line_start.value,
-            line_end=code_block_insp.attrs.line_end.value,
-            file_path=code_block_insp.attrs.file_path.value if code_block_insp.attrs.file_path.value else None
-        )
-        
-        # Build suggested_replacement CodeBlockBase if exists
-        suggested_replacement_dto = None
-        diff_text = None
-        if analysis_insp.attrs.suggested_replacement.value is not None:
-            # For now, suggested_replacement is stored as text in database
-            # We need to create a minimal CodeBlockBase for it
-            # In future, we might store it as proper CodeBlock
-            suggested_replacement_dto = CodeBlockBase(
-                id=f"{analysis_insp.attrs.id.value}_replacement",
-                created_at=analysis_insp.attrs.created_at.value,
-                raw_code=analysis_insp.attrs.suggested_replacement.value,
-                line_start=0,
-                line_end=0,
-                file_path=None
-            )
-            
-            # Generate diff between original and remediation code
-            original_code = code_block_insp.attrs.raw_code.value
-            fixed_code = analysis_insp.attrs.suggested_replacement.value
-            diff_text = DiffGenerator.generate_unified_diff(
-                original_code,
-                fixed_code,
-                original_label="vulnerable_code",
-                fixed_label="remediated_code"
-            )
-        
-        # Get risk level as string if exists
-        risk_level_str = None
-        if analysis_insp.attrs.risk_level.value is not None:
-            risk_level_str = analysis_insp.attrs.risk_level.value.value
-        
-        analysis_detail = AnalysisDetail(
-            id=analysis_insp.attrs.id.value,
-            created_at=analysis_insp.attrs.created_at.value,
-            session_id=analysis_insp.attrs.session_id.value,
-            code_block_id=analysis_insp.attrs.code_block_id.value,
-            code_block_type=CodeBlockType(analysis_insp.attrs.code_block_type.value.value),
-            suggested_replacement=suggested_replacement_dto,
-            code_block=code_block_dto,
-            # Enhanced fields
-            cwe_id=analysis_insp.attrs.cwe_id.value,
-            owasp_category=analysis_insp.attrs.owasp_category.value,
-            risk_level=risk_level_str,
-            confidence_score=analysis_insp.attrs.confidence_score.value,
-            vulnerability_description=analysis_insp.attrs.vulnerability_description.value,
-            exploitation_scenario=analysis_insp.attrs.exploitation_scenario.value,
-            remediation_explanation=analysis_insp.attrs.remediation_explanation.value,
-            diff=diff_text,
-            llm_metadata=analysis_insp.attrs.llm_metadata.value
-        )
-        analyses.append(analysis_detail)
-    
-    # Use SQLAlchemy inspect to get actual attribute values with proper typing
-    from sqlalchemy import inspect
-    session_insp = inspect(session)
-    
-    session_id = session_insp.attrs.id.value
-    status_value = DTOSessionStatus(session_insp.attrs.status.value.value)
-    progress_value = session_insp.attrs.progress.value
-    created_at_value = session_insp.attrs.created_at.value
-    updated_at_value = session_insp.attrs.updated_at.value
-    completed_at_value = session_insp.attrs.completed_at.value
-    error_message_value = session_insp.attrs.error_message.value
     
-    return GetSessionOutput(
-        id=session_id,
-        status=status_value,
-        progress=progress_value,
-        created_at=created_at_value,
-        updated_at=updated_at_value,
-        completed_at=completed_at_value,
-        error_message=error_message_value,
-        analyses=analyses
+    # Serialize with the cached adapter and return the bytes directly so
+    # FastAPI doesn't re-validate the whole analysis tree
+    return Response(
+        content=_GET_SESSION_ADAPTER.dump_json(session_output),
+        media_type="application/json"
     )
 
 @router.get("/sessions/{session_id}/status", 
-            response_model=SessionStatusResponse,
+            responses={200: {"model": SessionStatusResponse}},
             summary="Get session status",
             description="""Lightweight endpoint for polling analysis progress.
             
@@ -340,9 +343,14 @@ Returns current status and progress percentage (0-100).
 - `FAILED`: Analysis failed (check error_message in full session)""")
 async def get_session_status(
     session_id: str,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db_ro)
 ):
     """Get lightweight session status for progress polling."""
+    cache = get_status_cache()
+    cached = cache.get(session_id)
+    if cached is not None:
+        return ORJSONResponse(cached)
+    
     session_service = SessionService(db)
     session = await session_service.get_session(session_id)
     
@@ -352,19 +360,14 @@ async def get_session_status(
             detail=f"Session {session_id} not found"
         )
     
-    # Use SQLAlchemy inspect to get actual attribute values with proper typing
-    from sqlalchemy import inspect
-    session_insp = inspect(session)
-    
-    session_id_value = session_insp.attrs.id.value
-    status_value = DTOSessionStatus(session_insp.attrs.status.value.value)
-    progress_value = session_insp.attrs.progress.value
-    
-    return SessionStatusResponse(
-        session_id=session_id_value,
-        status=status_value,
-        progress=progress_value
+    status_output = SessionStatusResponse.model_construct(
+        session_id=session.id,
+        status=_DTO_STATUS_BY_MODEL[session.status],
+        progress=session.progress
     )
+    status_payload = status_output.model_dump()
+    cache.set(session_id, status_payload)
+    return ORJSONResponse(status_payload)
 
 @router.patch("/sessions/{session_id}",
               summary="Update session (internal)",
@@ -382,43 +385,56 @@ Not intended for external API consumers.
 
 ## Notes
 - Automatically sets `completed_at` when status changes to COMPLETED or FAILED
-- Updates `updated_at` timestamp""")
+- Updates `updated_at` timestamp
+- Requests that don't change any field leave the session untouched""")
 async def update_session(
     session_id: str,
     update_data: UpdateSessionInput,
     db: AsyncSession = Depends(get_db)
 ):
     """Internal endpoint for updating session metadata."""
-    session_service = SessionService(db)
-    session = await session_service.get_session(session_id)
-    
-    if not session:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Session {session_id} not found"
-        )
-    
-    # Update fields - using direct assignment which works at runtime
-    # Pylance has incorrect type stubs for SQLAlchemy, but this is correct
+    # Only the fields that were actually provided end up in the UPDATE
+    changes = update_data.model_dump(exclude_none=True)
     if update_data.status:
-        # Use setattr to avoid direct assignment type errors
-        setattr(session, 'status', update_data.status.value)
-    
-    if update_data.progress is not None:
-        setattr(session, 'progress', update_data.progress)
+        changes["status"] = _MODEL_STATUS_BY_DTO[update_data.status]
     
-    if update_data.error_message is not None:
-        setattr(session, 'error_message', update_data.error_message)
-    
-    # Update timestamp and commit
-    setattr(session, 'updated_at', datetime.utcnow())
+    if changes:
+        values = dict(changes)
+        
+        # Check if status changed to COMPLETED or FAILED; updated_at is
+        # stamped by the column's onupdate
+        if update_data.status in _TERMINAL_STATUSES:
+            values["completed_at"] = utcnow()
+        
+        # Single UPDATE ... WHERE id = :id round-trip, no row materialization;
+        # nothing is loaded in this session, so skip identity-map syncing.
+        # Rows whose provided fields already hold these values are left
+        # alone, so repeated progress pings don't rewrite the row.
+        result = await db.execute(
+            update(Session)
+            .where(Session.id == session_id)
+            .where(or_(*(
+                getattr(Session, field).is_distinct_from(value)
+                for field, value in changes.items()
+            )))
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        updated = result.rowcount > 0
+    else:
+        updated = False
     
-    # Check if status changed to COMPLETED or FAILED
-    # Get the status value that was just set
-    new_status = update_data.status.value if update_data.status else None
-    if new_status and (new_status == ModelSessionStatus.COMPLETED.value or new_status == ModelSessionStatus.FAILED.value):
-        setattr(session, 'completed_at', datetime.utcnow())
+    if not updated:
+        # Either nothing changed or the session doesn't exist
+        exists = await db.scalar(select(Session.id).where(Session.id == session_id))
+        if exists is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Session {session_id} not found"
+            )
+        return {"message": "Session unchanged"}
     
     await db.commit()
+    get_status_cache().invalidate(session_id)
     
     return {"message": "Session updated successfully"}
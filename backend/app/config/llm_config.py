@@ -1,29 +1,17 @@
-import os
 from pathlib import Path
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from typing import Optional
-from dotenv import load_dotenv, find_dotenv
 
 
-# Get the directory of this config file
-config_dir = Path(__file__).parent.parent.parent
-os.chdir(config_dir)
-
-# Try to find .env in the backend directory
-env_path = config_dir / "backend" / ".env"
-if env_path.exists():
-    load_dotenv(env_path)
-elif not find_dotenv():
-    pass  # No .env file - continue without it
-else:
-    load_dotenv()
+# backend/.env, resolved once and independent of the working directory
+ENV_FILE = Path(__file__).resolve().parents[2] / ".env"
 
 
 class LLMConfig(BaseSettings):
     """Configuration for LLM service."""
     
     # Core LLM configuration
-    api_key: Optional[str] = os.environ['LLM_API_KEY'] or None
+    api_key: Optional[str] = None
     model: str = "deepseek-chat"
     base_url: str = "https://api.deepseek.com"
     
@@ -39,12 +27,17 @@ class LLMConfig(BaseSettings):
     max_retries: int = 0
     retry_delay: int = 2  # seconds
     
+    # Upper bound on pipelines in flight at once (provider rate limits)
+    max_concurrency: int = 4
+    
     # Cost/token tracking
     enable_token_tracking: bool = True
     
-    class Config:
-        env_file = ".env"
-        env_prefix = "LLM_"
+    model_config = SettingsConfigDict(
+        env_file=ENV_FILE,
+        env_prefix="LLM_",
+        extra="ignore",  # .env also carries non-LLM settings
+    )
     
     def __init__(self, **kwargs):
         """Initialize configuration."""
@@ -1,6 +1,9 @@
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
+import logging
 import os
+import orjson
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -12,13 +15,61 @@ DATABASE_URL = os.getenv(
     "sqlite+aiosqlite:///./rust_green.db"
 )
 
+# Statement logging is opt-in; it formats every statement on the hot path.
+# Run with SQL_ECHO=true to log SQL while debugging.
+SQL_ECHO = os.getenv("SQL_ECHO", "false").lower() in ("1", "true", "yes")
+if not SQL_ECHO:
+    # Keep the engine logger quiet even if the root logger is at INFO
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
+
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+
+# Pool settings for server databases. SQLite keeps SQLAlchemy's default
+# pool for aiosqlite since there is no network connection to reuse.
+if IS_SQLITE:
+    # Wait on a locked database instead of failing immediately
+    _pool_options = {"connect_args": {"timeout": 30}}
+else:
+    _pool_options = {
+        "pool_size": 20,
+        "max_overflow": 40,
+        "pool_timeout": 30,
+        "pool_recycle": 3600,
+        "pool_pre_ping": True,
+    }
+
+def _json_dumps(value) -> str:
+    """Encode JSON columns with orjson; the drivers expect str, not bytes."""
+    return orjson.dumps(value).decode()
+
 # Create async engine
 engine = create_async_engine(
     DATABASE_URL,
-    echo=True,  # Set to False in production
+    echo=SQL_ECHO,
     future=True,
+    json_serializer=_json_dumps,
+    json_deserializer=orjson.loads,
+    **_pool_options,
 )
 
+# SQLite tuning applied to every new connection: WAL lets readers run
+# alongside the worker's writes, and synchronous=NORMAL drops the fsync
+# per commit (still durable at checkpoints under WAL)
+_SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",
+)
+
+if IS_SQLITE:
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in _SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+        cursor.close()
+
 # Create async session factory
 AsyncSessionLocal = async_sessionmaker(
     engine,
@@ -32,13 +83,26 @@ class Base(DeclarativeBase):
 
 # Dependency to get database session
 async def get_db():
-    """Get database session dependency."""
+    """Get database session dependency.
+    
+    Handlers that write commit explicitly; nothing is committed here so
+    read-only requests don't pay for a transaction commit.
+    """
     async with AsyncSessionLocal() as session:
         try:
             yield session
-            await session.commit()
         except Exception:
             await session.rollback()
             raise
         finally:
             await session.close()
+
+# Dependency for read-only handlers
+async def get_db_ro():
+    """Get a database session for read-only handlers.
+    
+    Autoflush is disabled since nothing is ever written through it; the
+    implicit transaction is simply rolled back when the session closes.
+    """
+    async with AsyncSessionLocal(autoflush=False) as session:
+        yield session
@@ -1,10 +1,13 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 import asyncio
 from contextlib import asynccontextmanager
 import logging
 
-from app.database import engine, Base
+from app.database import engine, Base, AsyncSessionLocal
+from app import models  # noqa: F401  registers all tables on Base.metadata
+from app.queue import analysis_queue, get_analysis_queue
 from app.services.session_service import SessionService
 from app.services.pipeline.analysis_worker import AnalysisWorker
 from app.api.v1 import sessions
@@ -16,8 +19,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Global message queue for analysis jobs
-analysis_queue = asyncio.Queue()
 analysis_worker = None
 
 @asynccontextmanager
@@ -31,6 +32,15 @@ async def lifespan(app: FastAPI):
         await conn.run_sync(Base.metadata.create_all)
     logger.info("Database tables created")
     
+    # Re-enqueue sessions left unfinished by a previous process; the queue
+    # is in-memory, so anything committed but not yet processed was lost
+    async with AsyncSessionLocal() as db:
+        pending_ids = await SessionService(db).list_unfinished_session_ids()
+    for session_id in pending_ids:
+        analysis_queue.put_nowait(session_id)
+    if pending_ids:
+        logger.info(f"Re-enqueued {len(pending_ids)} unfinished sessions")
+    
     # Start analysis worker
     global analysis_worker
     analysis_worker = AnalysisWorker(analysis_queue)
@@ -44,6 +54,9 @@ async def lifespan(app: FastAPI):
     if analysis_worker:
         await analysis_worker.stop()
     logger.info("Analysis worker stopped")
+    
+    await engine.dispose()
+    logger.info("Database connections closed")
 
 # Create FastAPI app
 app = FastAPI(
@@ -75,6 +88,7 @@ tracking analysis sessions, and retrieving results.
         "url": "https://opensource.org/licenses/MIT",
     },
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # Configure CORS
@@ -102,7 +116,3 @@ async def root():
 async def health_check():
     """Health check endpoint."""
     return {"status": "healthy", "timestamp": "2023-10-01T10:00:00Z"}
-
-# Export the queue for use in other modules
-def get_analysis_queue():
-    return analysis_queue
@@ -0,0 +1,18 @@
+"""ORM models.
+
+Importing this package registers every mapper on Base.metadata exactly
+once, so string relationship targets resolve and create_all sees every
+table regardless of which model a caller imports first.
+"""
+from .session import Session, SessionStatus
+from .code_block import CodeBlock
+from .analysis import Analysis, CodeBlockType, RiskLevel
+
+__all__ = [
+    "Session",
+    "SessionStatus",
+    "CodeBlock",
+    "Analysis",
+    "CodeBlockType",
+    "RiskLevel",
+]
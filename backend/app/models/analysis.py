@@ -1,10 +1,12 @@
 from sqlalchemy import Column, String, Text, DateTime, Enum, ForeignKey, Float, JSON
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import relationship
 import uuid
-from datetime import datetime
 from enum import Enum as PyEnum
 
 from app.database import Base
+from app.utils.clock import utcnow
 
 class CodeBlockType(PyEnum):
     REPLACEABLE = "replaceable"
@@ -23,7 +25,7 @@ class Analysis(Base):
     __tablename__ = "analyses"
     
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    session_id = Column(String(36), ForeignKey("sessions.id"), nullable=False)
+    session_id = Column(String(36), ForeignKey("sessions.id"), nullable=False, index=True)
     code_block_id = Column(String(36), ForeignKey("code_blocks.id"), nullable=False)
     
     # Analysis results
@@ -42,14 +44,20 @@ class Analysis(Base):
     remediation_explanation = Column(Text, nullable=True)
     
     # LLM metadata
-    llm_metadata = Column(JSON, nullable=True)  # Raw LLM response, tokens used, etc.
+    # Raw LLM response, tokens used, etc.; binary JSONB on Postgres
+    llm_metadata = Column(JSON().with_variant(JSONB, "postgresql"), nullable=True)
     
     # Timestamps
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=utcnow)
     
     # Relationships
     session = relationship("Session", back_populates="analyses")
     code_block = relationship("CodeBlock", back_populates="analysis")
     
+    @hybrid_property
+    def suggested_replacement_id(self):
+        """Synthetic id for the suggested replacement code block."""
+        return self.id + "_replacement"
+    
     def __repr__(self):
         return f"<Analysis(id={self.id}, type={self.code_block_type}, cwe={self.cwe_id}, risk={self.risk_level})>"
@@ -1,9 +1,9 @@
 from sqlalchemy import Column, String, Text, Integer, DateTime
 from sqlalchemy.orm import relationship
 import uuid
-from datetime import datetime
 
 from app.database import Base
+from app.utils.clock import utcnow
 
 class CodeBlock(Base):
     """CodeBlock entity representing an unsafe code segment."""
@@ -20,7 +20,7 @@ class CodeBlock(Base):
     line_end = Column(Integer, nullable=False)
     
     # Timestamps
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=utcnow)
     
     # Relationships
     analysis = relationship("Analysis", back_populates="code_block", uselist=False)
@@ -1,10 +1,10 @@
-from sqlalchemy import Column, String, DateTime, Enum as SQLAEnum, Text, Integer
+from sqlalchemy import Column, String, DateTime, Enum as SQLAEnum, Text, Integer, Index
 from sqlalchemy.orm import relationship
 import uuid
-from datetime import datetime
 from enum import Enum as PyEnum
 
 from app.database import Base
+from app.utils.clock import utcnow
 
 class SessionStatus(PyEnum):
     PENDING = "pending"
@@ -22,8 +22,10 @@ class Session(Base):
     progress = Column(Integer, default=0)  # 0-100 percentage
     
     # Timestamps
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=utcnow)
+    # Stamped on every UPDATE, ORM flush or Core statement, with the same
+    # clock (and precision) as created_at
+    updated_at = Column(DateTime, default=utcnow, onupdate=utcnow)
     completed_at = Column(DateTime, nullable=True)
     
     # Metadata
@@ -32,5 +34,9 @@ class Session(Base):
     # Relationships
     analyses = relationship("Analysis", back_populates="session", cascade="all, delete-orphan")
     
+    # Status filters ordered by creation time (listing, startup recovery)
+    # are served straight from this index, without a scan or sort step
+    __table_args__ = (Index("ix_sessions_status_created_at", "status", "created_at"),)
+    
     def __repr__(self):
         return f"<Session(id={self.id}, status={self.status}, progress={self.progress}%)>"
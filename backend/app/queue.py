@@ -0,0 +1,8 @@
+"""Shared in-process queue for analysis jobs."""
+import asyncio
+
+# Global message queue for analysis jobs
+analysis_queue = asyncio.Queue()
+
+def get_analysis_queue():
+    return analysis_queue
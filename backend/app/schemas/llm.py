@@ -0,0 +1,37 @@
+"""Schemas for structured LLM responses.
+
+Mirror the JSON layouts requested in the LLM service system prompts.
+Unknown keys are kept, so anything extra the model returns still reaches
+the caller.
+"""
+from typing import List, Optional
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+
+LLM_RESPONSE_CONFIG = ConfigDict(extra='allow')
+
+class VulnerabilityAnalysisModel(BaseModel):
+    """Response to the vulnerability analysis prompt."""
+    model_config = LLM_RESPONSE_CONFIG
+    
+    vulnerability_type: str
+    cwe_id: Optional[str] = None
+    owasp_category: Optional[str] = None
+    risk_level: Optional[str] = None  # "low", "medium", "high", "critical"
+    confidence_score: Optional[float] = None
+    vulnerability_description: Optional[str] = None
+    exploitation_scenario: Optional[str] = None
+    line_numbers: List[int] = Field(default_factory=list)
+    
+    @field_validator('line_numbers', mode='before')
+    @classmethod
+    def null_line_numbers_to_empty(cls, value):
+        # Models sometimes send null instead of [] when nothing was found
+        return [] if value is None else value
+
+class RemediationModel(BaseModel):
+    """Response to the remediation prompt."""
+    model_config = LLM_RESPONSE_CONFIG
+    
+    fixed_code: str
+    explanation: Optional[str] = None
+    compatibility_notes: Optional[str] = None
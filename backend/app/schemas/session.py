@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from enum import Enum
@@ -14,6 +14,9 @@ class CodeBlockType(str, Enum):
     NON_REPLACEABLE = "non_replaceable"
     CONDITIONALLY_REPLACEABLE = "conditionally_replaceable"
 
+# Response/internal schemas are built straight from ORM rows
+ORM_SCHEMA_CONFIG = ConfigDict(from_attributes=True, extra='ignore', use_enum_values=True)
+
 # Request schemas (to be updated when API endpoints are updated)
 class SessionCreate(BaseModel):
     code: str = Field(..., description="Rust source code to analyze")
@@ -24,6 +27,8 @@ class SessionUpdate(BaseModel):
 
 # Response schemas (to be updated when API endpoints are updated)
 class SessionBase(BaseModel):
+    model_config = ORM_SCHEMA_CONFIG
+    
     id: str
     status: SessionStatus
     progress: int
@@ -49,6 +54,8 @@ class SessionStatusResponse(BaseModel):
 
 # Basic schemas matching new models (for internal use)
 class CodeBlockSchema(BaseModel):
+    model_config = ORM_SCHEMA_CONFIG
+    
     id: str
     raw_code: str
     line_start: int
@@ -57,6 +64,8 @@ class CodeBlockSchema(BaseModel):
     created_at: datetime
 
 class AnalysisSchema(BaseModel):
+    model_config = ORM_SCHEMA_CONFIG
+    
     id: str
     session_id: str
     code_block_id: str
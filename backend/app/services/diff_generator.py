@@ -1,12 +1,57 @@
 """
 Diff generator service for creating diffs between vulnerable and remediated code.
 """
-import difflib
-from typing import Optional, Dict, Any, List
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Callable, Hashable, List, Sequence, Tuple
 from dataclasses import dataclass
 
+from app.services.myers import MyersMatcher
+from app.utils.content_hash import content_key
 
-@dataclass
+
+# Number of diff computations kept in memory, least recently used evicted first
+DIFF_CACHE_SIZE = 256
+
+# Inputs longer than this (in chars) are diffed without caching, so
+# the cache never pins very large texts in memory
+DIFF_CACHE_MAX_INPUT = 1 << 20
+
+_diff_cache: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+
+def _diff_key(original: Sequence[Any], fixed: Sequence[Any], *params: Hashable) -> Optional[Hashable]:
+    """Cache key for a pair of inputs, or None if either is too large to cache."""
+    if len(original) > DIFF_CACHE_MAX_INPUT or len(fixed) > DIFF_CACHE_MAX_INPUT:
+        return None
+    return (content_key(original), content_key(fixed), *params)
+
+
+def _cached(key: Optional[Hashable], compute: Callable[[], Any]) -> Any:
+    """Return the cached value for key, computing and storing it on a miss.
+    
+    Keys are content digests, so an entry can never go stale. A None key
+    (see _diff_key) computes without touching the cache.
+    """
+    if key is None:
+        return compute()
+    try:
+        value = _diff_cache[key]
+    except KeyError:
+        value = compute()
+        _diff_cache[key] = value
+        if len(_diff_cache) > DIFF_CACHE_SIZE:
+            _diff_cache.popitem(last=False)
+        return value
+    _diff_cache.move_to_end(key)
+    return value
+
+
+def clear_diff_cache() -> None:
+    """Drop every memoized diff."""
+    _diff_cache.clear()
+
+
+@dataclass(frozen=True)
 class DiffResult:
     """Result of a diff operation."""
     diff_text: str
@@ -16,6 +61,16 @@ class DiffResult:
     has_changes: bool
 
 
+# Result for identical inputs, whatever the labels
+NO_CHANGES = DiffResult(
+    diff_text="",
+    lines_added=0,
+    lines_removed=0,
+    lines_modified=0,
+    has_changes=False
+)
+
+
 class DiffGenerator:
     """Service for generating diffs between original and remediated code."""
     
@@ -40,26 +95,14 @@ class DiffGenerator:
         Returns:
             Unified diff string
         """
-        original_lines = original_code.splitlines(keepends=True)
-        fixed_lines = fixed_code.splitlines(keepends=True)
-        
-        # Use unified_diff from difflib
-        diff = difflib.unified_diff(
-            original_lines,
-            fixed_lines,
-            fromfile=original_label,
-            tofile=fixed_label,
-            lineterm='',
-            n=context_lines
-        )
-        
-        return ''.join(diff)
+        return DiffGenerator._compute(
+            original_code, fixed_code, original_label, fixed_label, context_lines
+        ).diff_text
     
     @staticmethod
     def generate_side_by_side_diff(
         original_code: str,
-        fixed_code: str,
-        width: int = 80
+        fixed_code: str
     ) -> List[Dict[str, str]]:
         """
         Generate a side-by-side diff representation.
@@ -67,37 +110,45 @@ class DiffGenerator:
         Args:
             original_code: The original vulnerable code
             fixed_code: The remediated/safe code
-            width: Maximum width for each side
             
         Returns:
-            List of dictionaries with 'original' and 'fixed' keys
+            List of dictionaries with 'original', 'fixed' and 'status' keys
         """
         original_lines = original_code.splitlines()
+        if original_code == fixed_code:
+            return [
+                {'original': line, 'fixed': line, 'status': 'unchanged'}
+                for line in original_lines
+            ]
         fixed_lines = fixed_code.splitlines()
         
-        # Use ndiff to get differences
-        diff = list(difflib.ndiff(original_lines, fixed_lines))
+        matcher = MyersMatcher(*_intern_lines(original_lines, fixed_lines))
         
         result = []
-        for line in diff:
-            if line.startswith('  '):  # Unchanged
-                result.append({
-                    'original': line[2:],
-                    'fixed': line[2:],
-                    'status': 'unchanged'
-                })
-            elif line.startswith('- '):  # Removed
-                result.append({
-                    'original': line[2:],
-                    'fixed': '',
-                    'status': 'removed'
-                })
-            elif line.startswith('+ '):  # Added
-                result.append({
-                    'original': '',
-                    'fixed': line[2:],
-                    'status': 'added'
-                })
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == 'equal':
+                result.extend(
+                    {'original': line, 'fixed': line, 'status': 'unchanged'}
+                    for line in original_lines[i1:i2]
+                )
+                continue
+            
+            removed = original_lines[i1:i2]
+            added = fixed_lines[j1:j2]
+            # Replaced lines are paired up so each removal sits next to the
+            # line that replaced it; the longer side's tail follows
+            for old_line, new_line in zip(removed, added):
+                result.append({'original': old_line, 'fixed': '', 'status': 'removed'})
+                result.append({'original': '', 'fixed': new_line, 'status': 'added'})
+            paired = min(len(removed), len(added))
+            result.extend(
+                {'original': line, 'fixed': '', 'status': 'removed'}
+                for line in removed[paired:]
+            )
+            result.extend(
+                {'original': '', 'fixed': line, 'status': 'added'}
+                for line in added[paired:]
+            )
         
         return result
     
@@ -113,19 +164,12 @@ class DiffGenerator:
         Returns:
             Dictionary with lines_added, lines_removed, lines_modified
         """
-        original_lines = original_code.splitlines()
-        fixed_lines = fixed_code.splitlines()
-        
-        diff = list(difflib.ndiff(original_lines, fixed_lines))
-        
-        lines_added = sum(1 for line in diff if line.startswith('+ '))
-        lines_removed = sum(1 for line in diff if line.startswith('- '))
-        lines_modified = min(lines_added, lines_removed)  # Approximation
+        result = DiffGenerator._compute(original_code, fixed_code)
         
         return {
-            "lines_added": lines_added,
-            "lines_removed": lines_removed,
-            "lines_modified": lines_modified
+            "lines_added": result.lines_added,
+            "lines_removed": result.lines_removed,
+            "lines_modified": result.lines_modified
         }
     
     @staticmethod
@@ -147,22 +191,127 @@ class DiffGenerator:
         Returns:
             DiffResult object with diff and statistics
         """
-        diff_text = DiffGenerator.generate_unified_diff(
-            original_code,
-            fixed_code,
+        return DiffGenerator._compute(original_code, fixed_code, original_label, fixed_label)
+    
+    @staticmethod
+    def _compute(
+        original_code: str,
+        fixed_code: str,
+        original_label: str = "vulnerable_code",
+        fixed_label: str = "remediated_code",
+        context_lines: int = 3
+    ) -> DiffResult:
+        """Memoized diff text and statistics for a pair of code strings."""
+        # Common when the remediation left the code as-is: one O(n) compare
+        # instead of hashing and matching
+        if original_code == fixed_code:
+            return NO_CHANGES
+        
+        key = _diff_key(original_code, fixed_code, original_label, fixed_label, context_lines)
+        # DiffResult is frozen, so the cached instance is shared as-is
+        return _cached(key, lambda: DiffGenerator._diff_lines(
+            original_code.splitlines(keepends=True),
+            fixed_code.splitlines(keepends=True),
             original_label,
-            fixed_label
-        )
+            fixed_label,
+            context_lines
+        ))
+    
+    @staticmethod
+    def _diff_lines(
+        original_lines: List[str],
+        fixed_lines: List[str],
+        original_label: str,
+        fixed_label: str,
+        context_lines: int
+    ) -> DiffResult:
+        """
+        Build the unified diff and the line counts from one matcher pass.
+        
+        The text is formatted as difflib.unified_diff(..., lineterm='') would
+        format the same opcodes; the counts come from those opcodes instead
+        of a second ndiff run.
+        """
+        matcher = MyersMatcher(*_intern_lines(original_lines, fixed_lines))
         
-        stats = DiffGenerator.generate_diff_stats(original_code, fixed_code)
+        # Every line outside a matching block was removed or added, so the
+        # counts fall out of the (few) matching blocks without a per-line pass
+        matched = sum(block.size for block in matcher.get_matching_blocks())
+        lines_removed = len(original_lines) - matched
+        lines_added = len(fixed_lines) - matched
+        
+        parts = _unified_diff_parts(
+            matcher, original_lines, fixed_lines, original_label, fixed_label, context_lines
+        )
+        diff_text = ''.join(parts)
         
         return DiffResult(
             diff_text=diff_text,
-            lines_added=stats["lines_added"],
-            lines_removed=stats["lines_removed"],
-            lines_modified=stats["lines_modified"],
+            lines_added=lines_added,
+            lines_removed=lines_removed,
+            lines_modified=min(lines_added, lines_removed),  # Approximation
             has_changes=bool(diff_text)
         )
     
+
+def _intern_lines(
+    original_lines: Sequence[Hashable],
+    fixed_lines: Sequence[Hashable]
+) -> Tuple[List[int], List[int]]:
+    """
+    Map each distinct line to a small int id shared by both sides.
+    
+    The matcher then compares ids, one int compare per step instead of a
+    string compare; opcodes index the id lists and the line lists alike.
+    """
+    ids: Dict[Hashable, int] = {}
+    original_ids = [ids.setdefault(line, len(ids)) for line in original_lines]
+    fixed_ids = [ids.setdefault(line, len(ids)) for line in fixed_lines]
+    return original_ids, fixed_ids
+
+
+def _unified_diff_parts(
+    matcher: MyersMatcher,
+    original_lines: Sequence[str],
+    fixed_lines: Sequence[str],
+    original_label: str,
+    fixed_label: str,
+    context_lines: int
+) -> List[str]:
+    """Unified diff pieces, ready to be joined."""
+    parts = []
+    for group in matcher.get_grouped_opcodes(context_lines):
+        if not parts:
+            parts.append(f'--- {original_label}')
+            parts.append(f'+++ {fixed_label}')
+        
+        first, last = group[0], group[-1]
+        original_range = _format_range(first[1], last[2])
+        fixed_range = _format_range(first[3], last[4])
+        parts.append(f'@@ -{original_range} +{fixed_range} @@')
+        
+        for tag, i1, i2, j1, j2 in group:
+            if tag == 'equal':
+                parts.extend(' ' + line for line in original_lines[i1:i2])
+                continue
+            if tag in ('replace', 'delete'):
+                parts.extend('-' + line for line in original_lines[i1:i2])
+            if tag in ('replace', 'insert'):
+                parts.extend('+' + line for line in fixed_lines[j1:j2])
+    
+    return parts
+
+
+def _format_range(start: int, stop: int) -> str:
+    """Unified diff hunk range, as difflib formats it."""
+    beginning = start + 1  # lines start numbering with one
+    length = stop - start
+    if length == 1:
+        return f'{beginning}'
+    if not length:
+        beginning -= 1  # empty ranges begin at line just before the range
+    return f'{beginning},{length}'
+
+
 # Global instance
 diff_generator = DiffGenerator()
@@ -1,7 +1,17 @@
 """File storage service for managing session code files."""
+import asyncio
+import mmap
+import os
 from pathlib import Path
 import shutil
-from typing import Optional
+from typing import Iterator, Optional, Tuple
+
+# Buffer for reading uploads; large enough that multi-MB files need few reads
+READ_BUFFER_SIZE = 1 << 20
+
+# Uploads at least this large are decoded straight from a memory map
+# instead of being copied into a bytes object first
+MMAP_MIN_SIZE = 4 << 20
 
 class FileStorageService:
     """Service for managing filesystem operations for session code storage."""
@@ -46,9 +56,32 @@ class FileStorageService:
         """
         session_dir = self.get_session_directory(session_id)
         code_file = session_dir / "uploaded_code.rs"
-        code_file.write_text(code)
+        code_file.write_text(code, encoding="utf-8")
         return code_file
     
+    async def save_uploaded_code_async(self, session_id: str, code: str) -> Path:
+        """Save uploaded code without blocking the event loop.
+        
+        Runs save_uploaded_code in a worker thread; use from async code.
+        """
+        return await asyncio.to_thread(self.save_uploaded_code, session_id, code)
+    
+    def _uploaded_code_path(self, session_id: str) -> Path:
+        """Path the uploaded code for a session lives at, existing or not."""
+        return self.base_dir / session_id / "repo" / "uploaded_code.rs"
+    
+    def _stat(self, session_id: str) -> Tuple[Path, Optional[os.stat_result]]:
+        """Stat the uploaded code file with a single syscall.
+        
+        Returns:
+            The code file path and its stat result, or None if it doesn't exist
+        """
+        code_file = self._uploaded_code_path(session_id)
+        try:
+            return code_file, code_file.stat()
+        except FileNotFoundError:
+            return code_file, None
+    
     def read_uploaded_code(self, session_id: str) -> Optional[str]:
         """Read uploaded Rust code from session directory.
         
@@ -56,12 +89,36 @@ class FileStorageService:
             session_id: Session ID
             
         Returns:
-            Code content if exists, None otherwise
+            Code content if exists, None otherwise. Callers can use this
+            alone instead of session_has_uploaded_code followed by a read.
+        """
+        # Open directly rather than checking first; a missing file is the
+        # only "no code" signal callers need
+        try:
+            # Undecodable bytes become U+FFFD rather than failing the session
+            with open(self._uploaded_code_path(session_id), "rb", buffering=READ_BUFFER_SIZE) as f:
+                if os.fstat(f.fileno()).st_size < MMAP_MIN_SIZE:
+                    # One large buffered read of the raw bytes, decoded once
+                    code = f.read().decode("utf-8", errors="replace")
+                else:
+                    # Decode from the page cache; the map is closed before
+                    # returning, so no later rewrite of the file can leave
+                    # a stale view behind
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        code = str(mapped, "utf-8", errors="replace")
+        except FileNotFoundError:
+            return None
+        
+        # Binary reads skip universal newlines; translate like read_text()
+        # so CRLF uploads don't leave a trailing \r on every line
+        return code.replace("\r\n", "\n").replace("\r", "\n")
+    
+    async def read_uploaded_code_async(self, session_id: str) -> Optional[str]:
+        """Read uploaded code without blocking the event loop.
+        
+        Runs read_uploaded_code in a worker thread; use from async code.
         """
-        code_file = self.base_dir / session_id / "repo" / "uploaded_code.rs"
-        if code_file.exists():
-            return code_file.read_text()
-        return None
+        return await asyncio.to_thread(self.read_uploaded_code, session_id)
     
     def session_has_uploaded_code(self, session_id: str) -> bool:
         """Check if session has uploaded code.
@@ -72,8 +129,8 @@ class FileStorageService:
         Returns:
             True if uploaded code exists
         """
-        code_file = self.base_dir / session_id / "repo" / "uploaded_code.rs"
-        return code_file.exists()
+        _, st = self._stat(session_id)
+        return st is not None
     
     def get_uploaded_code_path(self, session_id: str) -> Optional[Path]:
         """Get path to uploaded code file.
@@ -84,10 +141,8 @@ class FileStorageService:
         Returns:
             Path to code file if exists, None otherwise
         """
-        code_file = self.base_dir / session_id / "repo" / "uploaded_code.rs"
-        if code_file.exists():
-            return code_file
-        return None
+        code_file, st = self._stat(session_id)
+        return code_file if st is not None else None
     
     def cleanup_session_directory(self, session_id: str):
         """Delete session directory.
@@ -96,8 +151,19 @@ class FileStorageService:
             session_id: Session ID
         """
         session_dir = self.base_dir / session_id
-        if session_dir.exists():
-            shutil.rmtree(session_dir)
+        try:
+            # Usual layout is just repo/uploaded_code.rs: remove it with
+            # three syscalls instead of a full rmtree walk
+            try:
+                os.unlink(self._uploaded_code_path(session_id))
+            except FileNotFoundError:
+                pass
+            os.rmdir(session_dir / "repo")
+            os.rmdir(session_dir)
+        except OSError:
+            # Missing or unexpected layout (extra files, no repo dir)
+            if session_dir.exists():
+                shutil.rmtree(session_dir)
     
     def list_session_files(self, session_id: str) -> list[Path]:
         """List all files in session directory.
@@ -109,7 +175,20 @@ class FileStorageService:
             List of file paths
         """
         session_dir = self.base_dir / session_id / "repo"
-        if not session_dir.exists():
+        try:
+            return [Path(path) for path in _walk(session_dir)]
+        except FileNotFoundError:
             return []
-        
-        return list(session_dir.rglob("*"))
+
+
+def _walk(directory) -> Iterator[str]:
+    """Yield every path below directory, depth first.
+    
+    Uses os.scandir, whose entries carry their file type, instead of
+    Path.rglob, which stats and builds a Path per entry.
+    """
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            yield entry.path
+            if entry.is_dir(follow_symlinks=False):
+                yield from _walk(entry.path)
@@ -1,21 +1,103 @@
 """LLM service for Deepseek API integration."""
-import json
+import asyncio
 import logging
-from typing import Dict, List, Optional, Any
+import textwrap
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Final, Hashable, List, Optional
 from tenacity import retry, stop_after_attempt, wait_exponential
 import tiktoken
 from openai import AsyncOpenAI, OpenAIError
+from pydantic import ValidationError
 
 from app.config.llm_config import llm_config
+from app.schemas.llm import RemediationModel, VulnerabilityAnalysisModel
+from app.utils.content_hash import content_key
 
 logger = logging.getLogger(__name__)
 
+# GPT-4's encoding, used as an approximation for cost estimation
+TOKENIZER_ENCODING = "cl100k_base"
+
+# Token counts remembered per text digest, least recently used evicted first
+TOKEN_COUNT_CACHE_SIZE = 1024
+
+# Below this length encoding is cheaper than hashing and a cache lookup
+TOKEN_COUNT_CACHE_MIN_CHARS = 64
+
+# System prompts are fixed, so build them once; only user prompts vary
+_ANALYZE_SYSTEM_PROMPT: Final[str] = textwrap.dedent("""
+    You are a security expert specializing in Rust code analysis.
+    Analyze the provided Rust code for security vulnerabilities.
+    Return your analysis in JSON format with the following structure:
+    {
+        "vulnerability_type": "Description of vulnerability",
+        "cwe_id": "CWE-XXX",
+        "owasp_category": "A1: Injection",
+        "risk_level": "low|medium|high|critical",
+        "confidence_score": 0.95,
+        "vulnerability_description": "Detailed explanation of the vulnerability",
+        "exploitation_scenario": "How attackers could exploit this vulnerability",
+        "line_numbers": [start_line, end_line]
+    }
+
+    If no vulnerability is found, return:
+    {
+        "vulnerability_type": "None",
+        "cwe_id": null,
+        "owasp_category": null,
+        "risk_level": null,
+        "confidence_score": 1.0,
+        "vulnerability_description": "No security vulnerabilities detected",
+        "exploitation_scenario": null,
+        "line_numbers": []
+    }
+
+    Be specific, technical, and concise in your analysis.
+""").strip()
+
+_REMEDIATE_SYSTEM_PROMPT: Final[str] = textwrap.dedent("""
+    You are a Rust programming expert specializing in secure code remediation.
+    Generate a safe alternative for the vulnerable Rust code.
+    Return your response in JSON format:
+    {
+        "fixed_code": "Safe Rust code here",
+        "explanation": "Detailed explanation of security improvements made",
+        "compatibility_notes": "Any backward compatibility considerations"
+    }
+
+    Ensure the fixed code:
+    1. Eliminates the security vulnerability
+    2. Maintains functionality
+    3. Follows Rust best practices
+    4. Includes appropriate error handling
+
+    Provide concise explanations and remediation.
+""").strip()
+
+
+@lru_cache(maxsize=2)
+def _get_encoder(name: str) -> Optional[tiktoken.Encoding]:
+    """Load a tiktoken encoding once per process and share it.
+    
+    Loading parses the BPE ranks file, which is too slow to repeat per
+    service instance. Returns None if the encoding can't be loaded, in
+    which case token counting is disabled.
+    """
+    try:
+        return tiktoken.get_encoding(name)
+    except Exception as e:
+        logger.warning(f"Failed to load tokenizer {name}: {e}")
+        return None
+
 
 class LLMService:
     """Service for interacting with Deepseek LLM API."""
     
     def __init__(self):
         """Initialize LLM client with configuration."""
+        self._pipeline_slots = asyncio.Semaphore(max(1, llm_config.max_concurrency))
+        
         # Check if API key is available
         if not llm_config.api_key:
             logger.warning("LLM API key not configured. LLM features will be disabled.")
@@ -38,18 +120,31 @@ class LLMService:
         self.model = model
         self.max_tokens = llm_config.max_tokens
         self.temperature = llm_config.temperature
+        self._token_counts: "OrderedDict[Hashable, int]" = OrderedDict()
         
         # Initialize tokenizer for cost estimation
-        try:
-            self.tokenizer = tiktoken.encoding_for_model("gpt-4")  # Use GPT-4 as approximation
-        except:
-            self.tokenizer = tiktoken.get_encoding("cl100k_base")
+        self.tokenizer = _get_encoder(TOKENIZER_ENCODING)
     
     def count_tokens(self, text: str) -> int:
         """Count tokens in text for cost estimation."""
         if not self.tokenizer:
             return 0
-        return len(self.tokenizer.encode(text))
+        if len(text) < TOKEN_COUNT_CACHE_MIN_CHARS:
+            return len(self.tokenizer.encode(text))
+        
+        # Prompts and code are recounted across pipeline steps; key on a
+        # digest so the cache doesn't hold the texts themselves
+        key = content_key(text)
+        count = self._token_counts.get(key)
+        if count is not None:
+            self._token_counts.move_to_end(key)
+            return count
+        
+        count = len(self.tokenizer.encode(text))
+        self._token_counts[key] = count
+        if len(self._token_counts) > TOKEN_COUNT_CACHE_SIZE:
+            self._token_counts.popitem(last=False)
+        return count
     
     @retry(
         stop=stop_after_attempt(llm_config.max_retries),
@@ -69,15 +164,28 @@ class LLMService:
         messages.append({"role": "user", "content": prompt})
         
         try:
-            response = await self.client.chat.completions.create(
+            # Stream the completion so the body is read as it is generated
+            # rather than in one blocking read after the last token
+            stream = await self.client.chat.completions.create(
                 model=self.model,
                 messages=messages,
                 temperature=self.temperature,
-                response_format={"type": "json_object"}  # Request JSON response
+                response_format={"type": "json_object"},  # Request JSON response
+                stream=True,
+                stream_options={"include_usage": True}  # Usage arrives in the final chunk
             )
             
-            content = response.choices[0].message.content or ""
-            tokens_used = response.usage.total_tokens if response.usage else 0
+            parts: List[str] = []
+            tokens_used = 0
+            async for chunk in stream:
+                if chunk.choices:
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        parts.append(delta)
+                if chunk.usage:
+                    tokens_used = chunk.usage.total_tokens
+            
+            content = "".join(parts)
             
             logger.info(f"LLM call completed. Tokens used: {tokens_used}")
             
@@ -128,33 +236,7 @@ class LLMService:
                 "llm_metadata": {"disabled": True, "reason": "no_api_key"}
             }
         
-        system_prompt = """You are a security expert specializing in Rust code analysis.
-        Analyze the provided Rust code for security vulnerabilities.
-        Return your analysis in JSON format with the following structure:
-        {
-            "vulnerability_type": "Description of vulnerability",
-            "cwe_id": "CWE-XXX",
-            "owasp_category": "A1: Injection",
-            "risk_level": "low|medium|high|critical",
-            "confidence_score": 0.95,
-            "vulnerability_description": "Detailed explanation of the vulnerability",
-            "exploitation_scenario": "How attackers could exploit this vulnerability",
-            "line_numbers": [start_line, end_line]
-        }
-        
-        If no vulnerability is found, return:
-        {
-            "vulnerability_type": "None",
-            "cwe_id": null,
-            "owasp_category": null,
-            "risk_level": null,
-            "confidence_score": 1.0,
-            "vulnerability_description": "No security vulnerabilities detected",
-            "exploitation_scenario": null,
-            "line_numbers": []
-        }
-        
-        Be specific, technical, and concise in your analysis."""
+        system_prompt = _ANALYZE_SYSTEM_PROMPT
         
         prompt = f"""Analyze this Rust code for security vulnerabilities:
         
@@ -167,15 +249,16 @@ class LLMService:
         metadata = {}  # Initialize metadata
         try:
             response, metadata = await self._call_llm(prompt, system_prompt)
-            analysis = json.loads(response)
+            # Parse and check against the prompt's schema in one pass
+            analysis = VulnerabilityAnalysisModel.model_validate_json(response).model_dump()
             
             # Add metadata to analysis
             analysis["llm_metadata"] = metadata
             
             return analysis
             
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse LLM response as JSON: {e}")
+        except ValidationError as e:
+            logger.error(f"LLM response did not match the analysis schema: {e}")
             # Return fallback analysis
             return {
                 "vulnerability_type": "Analysis Error",
@@ -208,22 +291,7 @@ class LLMService:
                 "llm_metadata": {"disabled": True, "reason": "no_api_key"}
             }
         
-        system_prompt = """You are a Rust programming expert specializing in secure code remediation.
-        Generate a safe alternative for the vulnerable Rust code.
-        Return your response in JSON format:
-        {
-            "fixed_code": "Safe Rust code here",
-            "explanation": "Detailed explanation of security improvements made",
-            "compatibility_notes": "Any backward compatibility considerations"
-        }
-        
-        Ensure the fixed code:
-        1. Eliminates the security vulnerability
-        2. Maintains functionality
-        3. Follows Rust best practices
-        4. Includes appropriate error handling
-        
-        Provide concise explanations and remediation."""
+        system_prompt = _REMEDIATE_SYSTEM_PROMPT
         
         vulnerability_info = analysis.get("vulnerability_description", "Security vulnerability")
         cwe = analysis.get("cwe_id", "Unknown CWE")
@@ -241,7 +309,7 @@ class LLMService:
         metadata = {}  # Initialize metadata
         try:
             response, metadata = await self._call_llm(prompt, system_prompt)
-            remediation = json.loads(response)
+            remediation = RemediationModel.model_validate_json(response).model_dump()
             
             # Add metadata
             remediation["llm_metadata"] = metadata
@@ -287,6 +355,20 @@ class LLMService:
             "remediation": remediation,
             "pipeline_complete": True
         }
+    
+    async def analyze_many(self, snippets: List[str]) -> List[Any]:
+        """
+        Run the analysis pipeline over independent snippets concurrently.
+        
+        At most llm_config.max_concurrency pipelines run at once. Results
+        are returned in input order; a snippet whose pipeline raised gets
+        the exception in its slot instead of failing the whole batch.
+        """
+        async def run(snippet: str) -> Dict[str, Any]:
+            async with self._pipeline_slots:
+                return await self.complete_analysis_pipeline(snippet)
+        
+        return await asyncio.gather(*(run(s) for s in snippets), return_exceptions=True)
 
 
 # Global LLM service instance
@@ -0,0 +1,335 @@
+"""
+Myers O(ND) difference algorithm for line sequences.
+
+Runs in time proportional to (N + M) * D, where D is the number of inserted
+and deleted lines, so the usual remediation diff (a few lines changed in a
+long block) costs little more than a linear scan. Results are minimal edit
+scripts, exposed through the subset of difflib.SequenceMatcher's interface
+that DiffGenerator relies on. Past MAX_EDIT_DISTANCE edits (e.g. a block
+rewritten wholesale) the pure-Python search gives up and difflib, close to
+linear there, matches the lines instead.
+"""
+from difflib import Match, SequenceMatcher
+from typing import Any, List, Optional, Sequence, Tuple
+
+try:
+    # C++ LCS over sequences of hashables; an insert/delete-only (Indel)
+    # script is a longest common subsequence, i.e. what Myers finds.
+    # Pinned in requirements.txt; the Python search below only covers
+    # environments installed without it
+    from rapidfuzz.distance import Indel
+except ImportError:
+    Indel = None
+
+
+Opcode = Tuple[str, int, int, int, int]
+
+# Above this many lines (both sides, after trimming the common prefix and
+# suffix) the linear-space variant is used: the plain forward pass keeps
+# every round's V, O(D^2) memory, which adds up for long, heavily changed
+# files. Below it the simple variant has less overhead.
+LINEAR_SPACE_THRESHOLD = 2000
+
+# Edit distance beyond which the pure-Python search hands over to difflib;
+# caps its O((N + M) * D) worst case at a few milliseconds
+MAX_EDIT_DISTANCE = 256
+
+
+def _shortest_edit_trace(
+    a: Sequence[Any], b: Sequence[Any], max_d: int
+) -> Optional[List[List[int]]]:
+    """
+    Run the greedy forward pass, keeping the V array of every round, or
+    return None once more than max_d edits would be needed.
+
+    V holds, per diagonal k = x - y, the furthest x reached on it; it is a
+    flat list indexed k + offset, so the hot loop does no hashing. Before
+    round d, the slice for diagonals -d-1 .. d+1 (all the round reads) is
+    kept for the backtrack; in it diagonal k sits at index k + d + 1.
+    """
+    n, m = len(a), len(b)
+    offset = n + m + 1
+    v = [0] * (2 * offset + 1)
+    trace = []
+    for d in range(min(max_d, n + m) + 1):
+        trace.append(v[offset - d - 1:offset + d + 2])
+        # kk is k + offset throughout
+        lowest, highest = offset - d, offset + d
+        for kk in range(lowest, highest + 1, 2):
+            # Step down (insertion) from diagonal k+1 or right (deletion)
+            # from k-1, whichever got further
+            if kk == lowest or (kk != highest and v[kk - 1] < v[kk + 1]):
+                x = v[kk + 1]
+            else:
+                x = v[kk - 1] + 1
+            y = x - kk + offset
+            # Follow the snake of equal lines
+            while x < n and y < m and a[x] == b[y]:
+                x += 1
+                y += 1
+            v[kk] = x
+            if x >= n and y >= m:
+                return trace
+    return None
+
+
+def _common_affix_lengths(a: Sequence[Any], b: Sequence[Any]) -> Tuple[int, int]:
+    """Lengths of the common prefix and of the common suffix after it."""
+    limit = min(len(a), len(b))
+    prefix = 0
+    while prefix < limit and a[prefix] == b[prefix]:
+        prefix += 1
+    suffix = 0
+    limit -= prefix
+    while suffix < limit and a[-1 - suffix] == b[-1 - suffix]:
+        suffix += 1
+    return prefix, suffix
+
+
+def matching_blocks(a: Sequence[Any], b: Sequence[Any]) -> List[Match]:
+    """
+    Return the runs of equal elements along a shortest edit script.
+
+    Same shape as SequenceMatcher.get_matching_blocks(): ascending,
+    non-overlapping Match triples terminated by (len(a), len(b), 0).
+    Identical leading and trailing lines are matched up front, so the
+    search only runs over the changed middle; it is done natively by
+    rapidfuzz when that is installed, in Python otherwise.
+    """
+    n, m = len(a), len(b)
+    prefix, suffix = _common_affix_lengths(a, b)
+
+    middle_a, middle_b = a[prefix:n - suffix], b[prefix:m - suffix]
+    if Indel is not None:
+        middle = [
+            Match(*block)
+            for block in Indel.opcodes(middle_a, middle_b).as_matching_blocks()
+            if block.size
+        ]
+    else:
+        middle = _python_middle_blocks(middle_a, middle_b)
+
+    blocks = []
+    if prefix:
+        blocks.append(Match(0, 0, prefix))
+    blocks.extend(Match(i + prefix, j + prefix, size) for i, j, size in middle)
+    if suffix:
+        blocks.append(Match(n - suffix, m - suffix, suffix))
+
+    # Runs split across recursion boundaries are joined, as difflib does
+    merged = []
+    for block in blocks:
+        if merged:
+            i, j, size = merged[-1]
+            if i + size == block.a and j + size == block.b:
+                merged[-1] = Match(i, j, size + block.size)
+                continue
+        merged.append(block)
+    merged.append(Match(n, m, 0))
+    return merged
+
+
+def _python_middle_blocks(a: Sequence[Any], b: Sequence[Any]) -> List[Match]:
+    """Unterminated matching blocks of a and b, without rapidfuzz."""
+    if not a or not b or set(a).isdisjoint(b):
+        # Nothing in common, e.g. a rewrite sharing no line at all
+        return []
+
+    middle = None
+    # D is at least the length difference; skip a search bound to give up
+    if abs(len(a) - len(b)) <= MAX_EDIT_DISTANCE:
+        if len(a) + len(b) > LINEAR_SPACE_THRESHOLD:
+            middle = []
+            if not _linear_space_blocks(a, b, 0, len(a), 0, len(b), middle, MAX_EDIT_DISTANCE):
+                middle = None
+        else:
+            middle = _middle_blocks(a, b, MAX_EDIT_DISTANCE)
+    if middle is None:
+        # Heavily edited: difflib's matching is near-linear there, at the
+        # price of a possibly non-minimal diff
+        middle = SequenceMatcher(None, a, b).get_matching_blocks()[:-1]
+    return middle
+
+
+def _middle_blocks(a: Sequence[Any], b: Sequence[Any], max_d: int) -> Optional[List[Match]]:
+    """
+    Matching blocks of a and b by backtracking the forward pass,
+    unterminated, or None if they are more than max_d edits apart.
+    """
+    trace = _shortest_edit_trace(a, b, max_d)
+    if trace is None:
+        return None
+
+    blocks = []
+    x, y = len(a), len(b)
+    for d in range(len(trace) - 1, -1, -1):
+        v = trace[d]
+        k = x - y
+        kk = k + d + 1  # index of diagonal k in this round's slice
+        if k == -d or (k != d and v[kk - 1] < v[kk + 1]):
+            prev_k = k + 1
+            start_x = v[kk + 1]  # insertion: x unchanged
+        else:
+            prev_k = k - 1
+            start_x = v[kk - 1] + 1  # deletion: x advanced by one
+        # Lines from start_x up to x on diagonal k are the snake of round d
+        if x > start_x:
+            blocks.append(Match(start_x, start_x - k, x - start_x))
+        x = v[prev_k + d + 1]
+        y = x - prev_k
+
+    blocks.reverse()
+    return blocks
+
+
+def _find_middle_snake(
+    a: Sequence[Any], b: Sequence[Any], a_lo: int, a_hi: int, b_lo: int, b_hi: int,
+    max_d: Optional[int] = None
+) -> Optional[Tuple[int, int, int, int, int]]:
+    """
+    Run the forward and reverse passes over a[a_lo:a_hi], b[b_lo:b_hi] until
+    they overlap.
+
+    Only the two current V arrays are kept. The reverse pass works on both
+    ranges read backwards, so its reverse diagonal k is forward diagonal
+    delta - k.
+
+    Returns:
+        (D, x, y, u, v): edit distance of the ranges and the absolute start
+        (x, y) and end (u, v) of the middle snake, which lies on some
+        shortest edit script; None if D would exceed max_d
+    """
+    n, m = a_hi - a_lo, b_hi - b_lo
+    delta = n - m
+    odd = delta & 1
+    half_d = (n + m + 1) // 2
+    offset = half_d + 1
+    forward = [0] * (2 * offset + 1)
+    reverse = [0] * (2 * offset + 1)
+    if max_d is not None:
+        # Round d finds paths of 2d - 1 or 2d edits
+        half_d = min(half_d, (max_d + 1) // 2)
+
+    for d in range(half_d + 1):
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and forward[offset + k - 1] < forward[offset + k + 1]):
+                x = forward[offset + k + 1]
+            else:
+                x = forward[offset + k - 1] + 1
+            y = x - k
+            start_x, start_y = x, y
+            while x < n and y < m and a[a_lo + x] == b[b_lo + y]:
+                x += 1
+                y += 1
+            forward[offset + k] = x
+            # Reverse paths of round d - 1 cover diagonals delta +- (d - 1)
+            if odd and delta - (d - 1) <= k <= delta + (d - 1):
+                if x + reverse[offset + delta - k] >= n:
+                    return 2 * d - 1, a_lo + start_x, b_lo + start_y, a_lo + x, b_lo + y
+
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and reverse[offset + k - 1] < reverse[offset + k + 1]):
+                x = reverse[offset + k + 1]
+            else:
+                x = reverse[offset + k - 1] + 1
+            y = x - k
+            start_x, start_y = x, y
+            while x < n and y < m and a[a_hi - 1 - x] == b[b_hi - 1 - y]:
+                x += 1
+                y += 1
+            reverse[offset + k] = x
+            if not odd and -d <= delta - k <= d:
+                if x + forward[offset + delta - k] >= n:
+                    return 2 * d, a_hi - x, b_hi - y, a_hi - start_x, b_hi - start_y
+
+    if max_d is None:
+        raise AssertionError("forward and reverse passes never met")
+    return None
+
+
+def _linear_space_blocks(
+    a: Sequence[Any], b: Sequence[Any], a_lo: int, a_hi: int, b_lo: int, b_hi: int,
+    blocks: List[Match], max_d: Optional[int] = None
+) -> bool:
+    """
+    Append the matching blocks of a[a_lo:a_hi], b[b_lo:b_hi] to blocks.
+
+    Divide and conquer on the middle snake: each half has at most half the
+    edits, so memory stays O(N + M) and time O((N + M) * D).
+
+    Returns:
+        False, with nothing appended, if the ranges are more than max_d
+        edits apart
+    """
+    n, m = a_hi - a_lo, b_hi - b_lo
+    if not n or not m:
+        return True
+
+    snake = _find_middle_snake(a, b, a_lo, a_hi, b_lo, b_hi, max_d)
+    if snake is None:
+        return False
+    d, x, y, u, v = snake
+    if d > 1:
+        # The halves have fewer edits than the whole, so need no bound
+        _linear_space_blocks(a, b, a_lo, x, b_lo, y, blocks)
+        if u > x:
+            blocks.append(Match(x, y, u - x))
+        _linear_space_blocks(a, b, u, a_hi, v, b_hi, blocks)
+        return True
+
+    # At most one line inserted or deleted: everything else matches, split
+    # around that line
+    prefix = 0
+    while prefix < min(n, m) and a[a_lo + prefix] == b[b_lo + prefix]:
+        prefix += 1
+    if prefix:
+        blocks.append(Match(a_lo, b_lo, prefix))
+    rest = min(n, m) - prefix
+    if rest:
+        blocks.append(Match(a_hi - rest, b_hi - rest, rest))
+    return True
+
+
+def opcodes_from_blocks(blocks: Sequence[Match]) -> List[Opcode]:
+    """Turn matching blocks into SequenceMatcher-style opcodes."""
+    i = j = 0
+    opcodes = []
+    for ai, bj, size in blocks:
+        if i < ai and j < bj:
+            opcodes.append(('replace', i, ai, j, bj))
+        elif i < ai:
+            opcodes.append(('delete', i, ai, j, bj))
+        elif j < bj:
+            opcodes.append(('insert', i, ai, j, bj))
+        i, j = ai + size, bj + size
+        if size:
+            opcodes.append(('equal', ai, i, bj, j))
+    return opcodes
+
+
+class MyersMatcher:
+    """
+    Line matcher backed by the Myers algorithm.
+
+    Stands in for difflib.SequenceMatcher wherever only matching blocks and
+    (grouped) opcodes are needed; elements are compared with ==.
+    """
+
+    def __init__(self, a: Sequence[Any], b: Sequence[Any]):
+        self.a = a
+        self.b = b
+        self._blocks: Optional[List[Match]] = None
+        self._opcodes: Optional[List[Opcode]] = None
+
+    def get_matching_blocks(self) -> List[Match]:
+        if self._blocks is None:
+            self._blocks = matching_blocks(self.a, self.b)
+        return self._blocks
+
+    def get_opcodes(self) -> List[Opcode]:
+        if self._opcodes is None:
+            self._opcodes = opcodes_from_blocks(self.get_matching_blocks())
+        return self._opcodes
+
+    # Hunk grouping only looks at get_opcodes(), so difflib's is reused as-is
+    get_grouped_opcodes = SequenceMatcher.get_grouped_opcodes
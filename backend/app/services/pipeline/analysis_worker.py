@@ -1,27 +1,50 @@
 import asyncio
 import logging
-from typing import Optional
-import json
-from datetime import datetime
+from typing import Dict, Optional, Set
 
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import case, update
 from app.database import AsyncSessionLocal
 from app.models.session import Session, SessionStatus
-from app.models.code_block import CodeBlock
-from app.models.analysis import Analysis, CodeBlockType, RiskLevel
+from app.models.analysis import RiskLevel
 from app.services.file_storage_service import FileStorageService
+from app.services.session_service import save_analysis_results
+from app.services.unsafe_scan import scan_unsafe_blocks
 from app.config.llm_config import llm_config
+from app.status_cache import get_status_cache
+from app.utils.clock import utcnow
 
 logger = logging.getLogger(__name__)
 
+# Progress reports arriving within this window are collapsed into one write
+PROGRESS_DEBOUNCE_SECONDS = 0.25
+
+# Sessions analysed at once; each is mostly waiting on the LLM or database
+WORKER_CONCURRENCY = 4
+
+# Lower-cased LLM risk levels -> RiskLevel, derived from the enum so new
+# levels are picked up without touching this module
+_RISK_MAP = {level.value.lower(): level for level in RiskLevel}
+
 class AnalysisWorker:
     """Worker that processes analysis jobs from the queue."""
     
-    def __init__(self, queue: asyncio.Queue):
+    def __init__(self, queue: asyncio.Queue, concurrency: int = WORKER_CONCURRENCY):
         self.queue = queue
         self.running = False
         self.task: Optional[asyncio.Task] = None
+        self.concurrency = concurrency
+        self._slots = asyncio.Semaphore(concurrency)
+        self._in_flight: Set[asyncio.Task] = set()
         self.file_storage = FileStorageService()
+        self.status_cache = get_status_cache()
+        
+        # session_id -> latest unwritten progress, flushed for all sessions
+        # at once by a single timer
+        self._pending_progress: Dict[str, int] = {}
+        self._progress_flush: Optional[asyncio.TimerHandle] = None
+        # Flushes started by the timer; referenced here so they can't be
+        # garbage-collected mid-write and can be awaited on stop
+        self._flush_tasks: Set[asyncio.Task] = set()
         
         # Initialize LLM service if enabled
         self.use_llm = llm_config.enabled
@@ -53,21 +76,36 @@ class AnalysisWorker:
                 await self.task
             except asyncio.CancelledError:
                 pass
+        for task in list(self._in_flight):
+            task.cancel()
+        await asyncio.gather(*self._in_flight, return_exceptions=True)
+        
+        # Write the progress still waiting on the debounce timer
+        if self._progress_flush is not None:
+            self._progress_flush.cancel()
+        await asyncio.gather(*self._flush_tasks, return_exceptions=True)
+        await self._flush_progress()
         logger.info("Analysis worker stopped")
     
     async def _run(self):
         """Main worker loop."""
         while self.running:
             try:
-                # Wait for a job from the queue
-                session_id = await self.queue.get()
+                # Only take a job once there is a free slot for it, so queued
+                # sessions stay in the queue rather than piling up as tasks
+                await self._slots.acquire()
+                try:
+                    # Wait for a job from the queue
+                    session_id = await self.queue.get()
+                except BaseException:
+                    self._slots.release()
+                    raise
                 logger.info(f"Processing session: {session_id}")
                 
-                # Process the job
-                await self._process_session(session_id)
-                
-                # Mark task as done
-                self.queue.task_done()
+                # Process the job alongside the others in flight
+                task = asyncio.create_task(self._process_in_slot(session_id))
+                self._in_flight.add(task)
+                task.add_done_callback(self._in_flight.discard)
                 
             except asyncio.CancelledError:
                 break
@@ -75,34 +113,45 @@ class AnalysisWorker:
                 logger.error(f"Error in analysis worker: {e}", exc_info=True)
                 await asyncio.sleep(1)  # Prevent tight loop on errors
     
+    async def _process_in_slot(self, session_id: str):
+        """Process one job, then free its slot and mark it done."""
+        try:
+            await self._process_session(session_id)
+        except Exception as e:
+            logger.error(f"Error in analysis worker: {e}", exc_info=True)
+        finally:
+            self._slots.release()
+            # Mark task as done
+            self.queue.task_done()
+    
     async def _process_session(self, session_id: str):
         """Process a single analysis session."""
         async with AsyncSessionLocal() as db:
             try:
                 # Get session from database
-                from sqlalchemy import select
-                result = await db.execute(
-                    select(Session).where(Session.id == session_id)
-                )
-                session = result.scalar_one_or_none()
+                session = await db.get(Session, session_id)
                 
                 if not session:
                     logger.error(f"Session {session_id} not found")
                     return
                 
-                # Update status to processing
+                # Update status to processing, reading the uploaded code (in
+                # a thread) while the commit is in flight
                 session.status = SessionStatus.PROCESSING.value 
                 session.progress = 10 
-                await db.commit()
+                code_content, _ = await asyncio.gather(
+                    self.file_storage.read_uploaded_code_async(session_id),
+                    db.commit(),
+                )
+                self.status_cache.invalidate(session_id)
                 
                 # Get code for analysis
                 code_to_analyze = ""
                 
-                # Check if session has uploaded code
-                if self.file_storage.session_has_uploaded_code(session_id):
-                    code_content = self.file_storage.read_uploaded_code(session_id)
-                    if code_content:
-                        code_to_analyze = code_content
+                # Check if session has uploaded code; the read doubles as
+                # the existence check
+                if code_content is not None:
+                    code_to_analyze = code_content
                     logger.info(f"Using uploaded code for session {session_id}, {len(code_to_analyze)} chars")
                 elif session.orig_location is not None:
                     # Git URL - not implemented yet
@@ -121,39 +170,107 @@ class AnalysisWorker:
                 llm_available = bool(self.use_llm and self.llm_service)
                 if llm_available:
                     analyzed_blocks = await self._generate_llm_analysis(code_to_analyze)
+                else:
+                    analyzed_blocks = await self._generate_mock_analysis(code_to_analyze)
                 
-                session.progress = 90 
-                await db.commit()
+                self.report_progress(session_id, 90)
                 
-                # Save results to database
-                await self._save_results(db, session, analyzed_blocks, use_llm=llm_available)
+                # Save results to database; committed together with the
+                # completed status below
+                await save_analysis_results(db, session.id, analyzed_blocks, use_llm=llm_available)
                 
-                # Mark as completed
+                # Mark as completed; a terminal write supersedes any pending
+                # progress report
+                self._cancel_progress(session_id)
                 session.status = SessionStatus.COMPLETED.value 
                 session.progress = 100 
-                session.completed_at = datetime.utcnow() 
+                session.completed_at = utcnow() 
                 await db.commit()
+                self.status_cache.invalidate(session_id)
                 
                 logger.info(f"Session {session_id} analysis completed")
                 
             except Exception as e:
                 logger.error(f"Failed to process session {session_id}: {e}", exc_info=True)
+                pending_progress = self._cancel_progress(session_id)
+                # Discard partially saved results before recording the error
+                await db.rollback()
                 # Update session with error
                 try:
                     # Try to get session again to update error status
-                    from sqlalchemy import select
-                    result = await db.execute(
-                        select(Session).where(Session.id == session_id)
-                    )
-                    session_to_update = result.scalar_one_or_none()
+                    session_to_update = await db.get(Session, session_id)
                     if session_to_update:
                         session_to_update.status = SessionStatus.FAILED.value 
                         session_to_update.error_message = str(e) 
+                        if pending_progress is not None:
+                            session_to_update.progress = pending_progress
                         await db.commit()
+                        self.status_cache.invalidate(session_id)
                 except Exception as update_error:
                     logger.error(f"Failed to update session error status: {update_error}")
     
     
+    def report_progress(self, session_id: str, progress: int):
+        """Record progress for a session, batched into a shared write.
+        
+        Reports only update the pending value; a single timer, armed by the
+        first report, writes the latest value of every pending session in
+        one UPDATE after PROGRESS_DEBOUNCE_SECONDS.
+        """
+        self._pending_progress[session_id] = progress
+        if self._progress_flush is None:
+            loop = asyncio.get_running_loop()
+            self._progress_flush = loop.call_later(
+                PROGRESS_DEBOUNCE_SECONDS, self._start_progress_flush
+            )
+    
+    def _start_progress_flush(self):
+        """Timer callback: run _flush_progress as a tracked task."""
+        task = asyncio.create_task(self._flush_progress())
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+    
+    def _cancel_progress(self, session_id: str) -> Optional[int]:
+        """Drop a pending progress write, e.g. before a terminal status.
+        
+        Returns:
+            The progress that was pending, so the caller can fold it into
+            its own write, or None
+        """
+        return self._pending_progress.pop(session_id, None)
+    
+    async def _flush_progress(self):
+        """Write the latest reported progress of all pending sessions."""
+        self._progress_flush = None
+        pending, self._pending_progress = self._pending_progress, {}
+        if not pending:
+            return
+        
+        try:
+            async with AsyncSessionLocal() as db:
+                # Only while still processing, so a late flush can't
+                # overwrite a completed or failed session
+                await db.execute(
+                    update(Session)
+                    .where(Session.id.in_(pending))
+                    .where(Session.status == SessionStatus.PROCESSING)
+                    .values(progress=case(pending, value=Session.id))
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+            for session_id in pending:
+                self.status_cache.invalidate(session_id)
+        except Exception as e:
+            logger.warning(f"Failed to write progress for {len(pending)} session(s): {e}")
+    
+    async def _generate_mock_analysis(self, code: str) -> list:
+        """Find `unsafe { ... }` blocks without calling the LLM.
+        
+        The scan runs in a worker thread so large uploads don't stall the
+        event loop; see scan_unsafe_blocks.
+        """
+        return await asyncio.to_thread(scan_unsafe_blocks, code)
+    
     async def _generate_llm_analysis(self, code: str):
         """Generate enhanced analysis using LLM."""
         try:
@@ -178,21 +295,13 @@ class AnalysisWorker:
             line_end = line_numbers[1] if len(line_numbers) > 1 else line_start
             
             # Map risk level
-            risk_level_str = vulnerability_analysis.get("risk_level", "").lower()
-            risk_level = None
-            if risk_level_str == "low":
-                risk_level = RiskLevel.LOW
-            elif risk_level_str == "medium":
-                risk_level = RiskLevel.MEDIUM
-            elif risk_level_str == "high":
-                risk_level = RiskLevel.HIGH
-            elif risk_level_str == "critical":
-                risk_level = RiskLevel.CRITICAL
+            # The model may send null as well as omit the key
+            risk_level_str = (vulnerability_analysis.get("risk_level") or "").lower()
+            risk_level = _RISK_MAP.get(risk_level_str)
             
             # Determine analysis type based on remediation
-            analysis_type = "non_replaceable"
-            if remediation and remediation.get("fixed_code"):
-                analysis_type = "replaceable"
+            fixed_code = remediation.get("fixed_code") if remediation else None
+            analysis_type = "replaceable" if fixed_code else "non_replaceable"
             
             return [{
                 "raw_code": code,
@@ -210,67 +319,10 @@ class AnalysisWorker:
                     "vulnerability_analysis": vulnerability_analysis.get("llm_metadata", {}),
                     "remediation": remediation.get("llm_metadata", {}) if remediation else {}
                 },
-                "suggestions": [remediation.get("fixed_code")] if remediation and remediation.get("fixed_code") else []
+                "suggestions": [fixed_code] if fixed_code else []
             }]
             
         except Exception as e:
             logger.error(f"LLM analysis failed: {e}", exc_info=True)
             logger.info("Falling back to mock analysis")
             return []
-    
-    async def _save_results(self, db: AsyncSession, session: Session, analyzed_blocks: list, use_llm: bool = False):
-        """Save analysis results to database."""
-        logger.info(f"Saving {len(analyzed_blocks)} analyzed blocks for session {session.id}")
-        
-        for block_data in analyzed_blocks:
-            # Create CodeBlock
-            code_block = CodeBlock(
-                raw_code=block_data["raw_code"],
-                line_start=block_data["line_start"],
-                line_end=block_data["line_end"],
-                file_path=None  # Will be set when we have file structure
-            )
-            db.add(code_block)
-            await db.flush()  # Get the ID
-            
-            # Map analysis_type string to CodeBlockType enum
-            analysis_type_str = block_data.get("analysis_type", "non_replaceable")
-            if analysis_type_str == "replaceable":
-                code_block_type = CodeBlockType.REPLACEABLE
-            elif analysis_type_str == "conditionally_replaceable":
-                code_block_type = CodeBlockType.CONDITIONALLY_REPLACEABLE
-            else:
-                code_block_type = CodeBlockType.NON_REPLACEABLE
-            
-            # Get suggested replacement (first suggestion if exists)
-            suggested_replacement = None
-            suggestions = block_data.get("suggestions", [])
-            if suggestions:
-                suggested_replacement = suggestions[0]
-            
-            # Create Analysis with enhanced fields if available
-            analysis_kwargs = {
-                "session_id": session.id,
-                "code_block_id": code_block.id,
-                "code_block_type": code_block_type,
-                "suggested_replacement": suggested_replacement,
-            }
-            
-            # Add enhanced LLM fields if available
-            if use_llm:
-                analysis_kwargs.update({
-                    "cwe_id": block_data.get("cwe_id"),
-                    "owasp_category": block_data.get("owasp_category"),
-                    "risk_level": block_data.get("risk_level"),
-                    "confidence_score": block_data.get("confidence_score"),
-                    "vulnerability_description": block_data.get("vulnerability_description"),
-                    "exploitation_scenario": block_data.get("exploitation_scenario"),
-                    "remediation_explanation": block_data.get("remediation_explanation"),
-                    "llm_metadata": block_data.get("llm_metadata"),
-                })
-            
-            analysis = Analysis(**analysis_kwargs)
-            db.add(analysis)
-        
-        await db.commit()
-        logger.info(f"Saved {len(analyzed_blocks)} code blocks and analyses")
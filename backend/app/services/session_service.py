@@ -1,9 +1,24 @@
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+import logging
+
+from sqlalchemy.ext.asyncio import AsyncResult, AsyncSession
+from sqlalchemy import insert, select, func
+from sqlalchemy.orm import joinedload, selectinload
 from typing import Optional
 
 from app.models.session import Session, SessionStatus
+from app.models.analysis import Analysis, CodeBlockType
+from app.models.code_block import CodeBlock
 from app.services.file_storage_service import FileStorageService
+from app.utils.clock import utcnow
+
+logger = logging.getLogger(__name__)
+
+# analysis_type strings from the analyzers -> stored block type
+_TYPE_MAP = {
+    "replaceable": CodeBlockType.REPLACEABLE,
+    "conditionally_replaceable": CodeBlockType.CONDITIONALLY_REPLACEABLE,
+    "non_replaceable": CodeBlockType.NON_REPLACEABLE,
+}
 
 class SessionService:
     """Service for managing analysis sessions."""
@@ -15,13 +30,17 @@ class SessionService:
     async def create_session(
         self, 
         orig_location: Optional[str] = None,
-        code: Optional[str] = None
+        code: Optional[str] = None,
+        analyzed_blocks: Optional[list] = None
     ) -> Session:
         """Create a new analysis session.
         
         Args:
             orig_location: Git URL for repository analysis
             code: Raw Rust code content for direct analysis
+            analyzed_blocks: Results already computed for the code; the
+                session is then stored COMPLETED together with them, in
+                one transaction, and needs no queueing
             
         Returns:
             Session object
@@ -30,29 +49,55 @@ class SessionService:
         if not orig_location and not code:
             raise ValueError("Either orig_location or code must be provided")
         
-        # Create session in database
-        session = Session(
-            orig_location=orig_location,
-            status=SessionStatus.PENDING,
-            progress=0
-        )
+        # Create session in database; RETURNING hands back the stored row
+        # so no follow-up refresh SELECT is needed
+        # One timestamp for every column, so a session completed on insert
+        # never shows completed_at before created_at
+        now = utcnow()
+        values = {
+            "orig_location": orig_location,
+            "status": SessionStatus.PENDING,
+            "progress": 0,
+            "created_at": now,
+            "updated_at": now,
+        }
+        if analyzed_blocks is not None:
+            values.update(status=SessionStatus.COMPLETED, progress=100, completed_at=now)
         
-        self.db.add(session)
+        result = await self.db.execute(
+            insert(Session).values(**values).returning(Session)
+        )
+        session = result.scalar_one()
+        if analyzed_blocks is not None:
+            await save_analysis_results(self.db, session.id, analyzed_blocks)
         await self.db.commit()
-        await self.db.refresh(session)
         
         # Save uploaded code if provided
         if code:
-            self.file_storage.save_uploaded_code(session.id, code)
+            await self.file_storage.save_uploaded_code_async(session.id, code)
         
         return session
     
-    async def get_session(self, session_id: str) -> Optional[Session]:
-        """Get a session by ID."""
-        result = await self.db.execute(
-            select(Session).where(Session.id == session_id)
-        )
-        return result.scalar_one_or_none()
+    async def get_session(self, session_id: str, eager: bool = False) -> Optional[Session]:
+        """Get a session by ID.
+        
+        Args:
+            session_id: Session ID
+            eager: Also load the session's analyses and their code blocks
+            
+        Returns:
+            Session object, or None if it doesn't exist
+        """
+        options = []
+        if eager:
+            # Code blocks are one-to-one, so they ride along on the
+            # analyses query via a JOIN
+            options.append(
+                selectinload(Session.analyses).joinedload(Analysis.code_block)
+            )
+        # Primary-key lookup: served from the identity map when the row is
+        # already loaded in this session
+        return await self.db.get(Session, session_id, options=options)
     
     async def update_session_status(
         self, 
@@ -72,26 +117,61 @@ class SessionService:
         if error_message is not None:
             session.error_message = error_message
         
+        # updated_at is stamped client-side by the flush and commits don't
+        # expire, so the instance is current without a refresh SELECT
         await self.db.commit()
-        await self.db.refresh(session)
         return session
     
-    async def list_sessions(
+    def _sessions_with_counts_query(
         self, 
-        skip: int = 0, 
-        limit: int = 100,
-        status: Optional[SessionStatus] = None
-    ) -> list[Session]:
-        """List sessions with optional filtering."""
-        query = select(Session)
+        skip: int, 
+        limit: int,
+        status: Optional[SessionStatus]
+    ):
+        """Build the session listing query with a grouped analysis count."""
+        query = (
+            select(Session, func.count(Analysis.id).label("analysis_count"))
+            .outerjoin(Analysis, Analysis.session_id == Session.id)
+            .group_by(Session.id)
+        )
         
         if status:
             query = query.where(Session.status == status)
         
-        query = query.offset(skip).limit(limit)
+        # Newest first, served by ix_sessions_status_created_at when filtered
+        return query.order_by(Session.created_at.desc()).offset(skip).limit(limit)
+    
+    async def stream_sessions_with_counts(
+        self, 
+        skip: int = 0, 
+        limit: int = 100,
+        status: Optional[SessionStatus] = None,
+        batch_size: int = 100
+    ) -> AsyncResult:
+        """Stream sessions together with their analysis counts.
+        
+        The counts come from a single LEFT JOIN ... GROUP BY query instead
+        of one COUNT query per session, and rows are fetched from the cursor
+        in batches of batch_size instead of all at once.
         
-        result = await self.db.execute(query)
-        return result.scalars().all()
+        Returns:
+            AsyncResult yielding (session, analysis_count) rows
+        """
+        query = self._sessions_with_counts_query(skip, limit, status)
+        return await self.db.stream(query.execution_options(yield_per=batch_size))
+    
+    async def list_unfinished_session_ids(self) -> list[str]:
+        """Return ids of sessions that were never completed or failed.
+        
+        Used at startup to re-enqueue jobs lost when the in-memory queue
+        went away with a previous process.
+        """
+        result = await self.db.execute(
+            select(Session.id)
+            .where(Session.status.in_([SessionStatus.PENDING, SessionStatus.PROCESSING]))
+            .order_by(Session.created_at)
+        )
+        return list(result.scalars())
     
     async def delete_session(self, session_id: str) -> bool:
         """Delete a session."""
@@ -105,3 +185,73 @@ class SessionService:
         await self.db.delete(session)
         await self.db.commit()
         return True
+
+
+async def save_analysis_results(db: AsyncSession, session_id: str, analyzed_blocks: list, use_llm: bool = False):
+    """Save analysis results to database.
+    
+    Runs in the caller's transaction; the caller commits.
+    """
+    logger.info(f"Saving {len(analyzed_blocks)} analyzed blocks for session {session_id}")
+    
+    if not analyzed_blocks:
+        # Nothing to insert; an executemany needs at least one row
+        return
+    
+    # One multi-row INSERT per table instead of a flush per block;
+    # RETURNING hands back the generated code block ids in row order
+    code_block_rows = [
+        {
+            "raw_code": block_data["raw_code"],
+            "line_start": block_data["line_start"],
+            "line_end": block_data["line_end"],
+            "file_path": None,  # Will be set when we have file structure
+        }
+        for block_data in analyzed_blocks
+    ]
+    result = await db.execute(
+        insert(CodeBlock).returning(CodeBlock.id, sort_by_parameter_order=True),
+        code_block_rows
+    )
+    code_block_ids = result.scalars().all()
+    
+    analysis_rows = []
+    for block_data, code_block_id in zip(analyzed_blocks, code_block_ids):
+        # Map analysis_type string to CodeBlockType enum
+        code_block_type = _TYPE_MAP.get(
+            block_data.get("analysis_type", "non_replaceable"),
+            CodeBlockType.NON_REPLACEABLE
+        )
+        
+        # Get suggested replacement (first suggestion if exists)
+        suggested_replacement = None
+        suggestions = block_data.get("suggestions", [])
+        if suggestions:
+            suggested_replacement = suggestions[0]
+        
+        # Create Analysis with enhanced fields if available
+        analysis_kwargs = {
+            "session_id": session_id,
+            "code_block_id": code_block_id,
+            "code_block_type": code_block_type,
+            "suggested_replacement": suggested_replacement,
+        }
+        
+        # Add enhanced LLM fields if available
+        if use_llm:
+            analysis_kwargs.update({
+                "cwe_id": block_data.get("cwe_id"),
+                "owasp_category": block_data.get("owasp_category"),
+                "risk_level": block_data.get("risk_level"),
+                "confidence_score": block_data.get("confidence_score"),
+                "vulnerability_description": block_data.get("vulnerability_description"),
+                "exploitation_scenario": block_data.get("exploitation_scenario"),
+                "remediation_explanation": block_data.get("remediation_explanation"),
+                "llm_metadata": block_data.get("llm_metadata"),
+            })
+        
+        analysis_rows.append(analysis_kwargs)
+    
+    await db.execute(insert(Analysis), analysis_rows)
+    
+    logger.info(f"Saved {len(analyzed_blocks)} code blocks and analyses")
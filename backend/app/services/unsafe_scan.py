@@ -0,0 +1,70 @@
+"""LLM-free scan for `unsafe { ... }` blocks in Rust source."""
+import re
+
+try:
+    # RE2 matches in linear time with a DFA; same compile/search/finditer
+    # interface as the re module for the patterns below
+    import re2 as _regex
+except ImportError:
+    _regex = re
+
+# `unsafe` as a whole word followed by an opening brace, i.e. an unsafe
+# block rather than `unsafe fn`/`unsafe impl`; compiled once per process
+_UNSAFE_BLOCK_START = _regex.compile(r"\bunsafe\s*\{")
+_BRACE = _regex.compile(r"[{}]")
+
+
+def scan_unsafe_blocks(code: str) -> list:
+    """Find `unsafe { ... }` blocks in Rust source without calling the LLM.
+    
+    One forward pass: each `unsafe {` found by a precompiled pattern is
+    matched to its closing brace by depth counting (so nested braces
+    are handled), and line numbers come from a running newline count
+    rather than re-counting from the start of the file per block.
+    Comments and string literals are not special-cased.
+    
+    Returns:
+        Block dicts in the shape save_analysis_results expects, 1-based lines
+    """
+    if "unsafe" not in code:
+        # Common case for safe code: a substring check settles it without
+        # a regex scan
+        return []
+    
+    blocks = []
+    line_no = 1
+    counted_to = 0  # newlines before this offset are in line_no
+    
+    match = _UNSAFE_BLOCK_START.search(code)
+    while match:
+        i = match.start()
+        depth = 0
+        for brace in _BRACE.finditer(code, match.end() - 1):
+            if brace.group() == "{":
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    break
+        if depth:
+            # Unterminated block; nothing further can close it
+            break
+        k = brace.start()
+        
+        line_no += code.count("\n", counted_to, i)
+        line_start = line_no
+        line_no += code.count("\n", i, k)
+        counted_to = k
+        
+        blocks.append({
+            "raw_code": code[i:k + 1],
+            "line_start": line_start,
+            "line_end": line_no,
+            "analysis_type": "non_replaceable",
+            "risk_level": None,
+            "suggestions": [],
+        })
+        # Blocks nested inside this one are part of it
+        match = _UNSAFE_BLOCK_START.search(code, k + 1)
+    
+    return blocks
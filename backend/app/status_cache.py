@@ -0,0 +1,9 @@
+"""Shared in-process cache for session status polling."""
+from app.utils.ttl_cache import TTLCache
+
+# Polling responses keyed by session id; invalidated by PATCH and the
+# analysis worker whenever status/progress changes
+status_cache = TTLCache(maxsize=10_000, ttl=0.5)
+
+def get_status_cache():
+    return status_cache
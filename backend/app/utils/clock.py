@@ -0,0 +1,12 @@
+"""Clock helpers."""
+from datetime import datetime, timezone
+
+_UTC = timezone.utc
+
+def utcnow() -> datetime:
+    """Return the current UTC time as a naive datetime.
+    
+    Drop-in replacement for the deprecated datetime.utcnow(); columns are
+    declared as naive DateTime, so tzinfo is stripped.
+    """
+    return datetime.now(_UTC).replace(tzinfo=None)
@@ -0,0 +1,21 @@
+"""Content hashing for in-process cache keys."""
+import hashlib
+from typing import Hashable, Union
+
+try:
+    # SIMD-accelerated, far faster than blake2b on large inputs
+    import xxhash
+except ImportError:
+    xxhash = None
+
+def content_key(data: Union[str, bytes]) -> Hashable:
+    """Return a fixed-size cache key for a (possibly large) text.
+    
+    Uses xxh3-128 when xxhash is installed, blake2b otherwise. Keys are only
+    comparable within one process; never persist them.
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8", "surrogatepass")
+    if xxhash is not None:
+        return xxhash.xxh3_128_intdigest(data)
+    return hashlib.blake2b(data, digest_size=16).digest()
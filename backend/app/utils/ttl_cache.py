@@ -0,0 +1,45 @@
+"""Small in-process TTL cache."""
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+class TTLCache:
+    """Bounded mapping whose entries expire after a fixed time-to-live.
+    
+    Entries are evicted oldest-first once maxsize is reached. Not safe to
+    share across processes; each worker process keeps its own copy.
+    """
+    
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired."""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        return value
+    
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting the oldest entry when full."""
+        self._data.pop(key, None)
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+    
+    def invalidate(self, key: Hashable) -> None:
+        """Drop a key if present."""
+        self._data.pop(key, None)
+    
+    def clear(self) -> None:
+        """Drop every entry."""
+        self._data.clear()
+    
+    def __len__(self) -> int:
+        return len(self._data)
@@ -13,7 +13,9 @@ import os
 import pytest
 import pytest_asyncio
 from typing import AsyncGenerator
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.pool import StaticPool
 from httpx import AsyncClient, ASGITransport
 
 # Set testing environment variables before imports
@@ -33,38 +35,60 @@ def event_loop():
     loop.close()
 
 
-@pytest_asyncio.fixture
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
 async def test_db_engine():
-    """Create test database engine."""
+    """Create the test database engine and schema once per test session.
+    
+    StaticPool keeps a single connection, so every user of the engine sees
+    the same in-memory database.
+    """
     from app.database import Base
     
     engine = create_async_engine(
         "sqlite+aiosqlite:///:memory:",
         echo=False,
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
     )
     
+    # Let SQLAlchemy issue BEGIN itself so SAVEPOINTs (per-test isolation
+    # in test_db) work; the sqlite3 driver's implicit transactions break them
+    @event.listens_for(engine.sync_engine, "connect")
+    def _disable_driver_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+    
+    @event.listens_for(engine.sync_engine, "begin")
+    def _emit_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+    
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
     
     yield engine
     
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.drop_all)
-    
     await engine.dispose()
 
 
-@pytest_asyncio.fixture
+@pytest_asyncio.fixture(loop_scope="session")
 async def test_db(test_db_engine) -> AsyncGenerator[AsyncSession, None]:
-    """Create test database session."""
-    async_session_maker = async_sessionmaker(
-        test_db_engine,
-        class_=AsyncSession,
-        expire_on_commit=False,
-    )
+    """Create a test database session rolled back after each test.
     
-    async with async_session_maker() as session:
-        yield session
+    The session runs inside an outer transaction; commits in the code under
+    test only release SAVEPOINTs, so the rollback undoes everything without
+    any per-test DDL.
+    """
+    async with test_db_engine.connect() as conn:
+        trans = await conn.begin()
+        session = AsyncSession(
+            bind=conn,
+            expire_on_commit=False,
+            join_transaction_mode="create_savepoint",
+        )
+        try:
+            yield session
+        finally:
+            await session.close()
+            await trans.rollback()
 
 
 @pytest_asyncio.fixture
@@ -83,7 +107,7 @@ async def test_client() -> AsyncGenerator[AsyncClient, None]:
         yield client
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_rust_code() -> str:
     """Sample vulnerable Rust code for testing."""
     return """
@@ -96,7 +120,7 @@ fn unsafe_read(path: &str) -> String {
 """
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_safe_rust_code() -> str:
     """Sample safe Rust code for testing."""
     return """
@@ -0,0 +1,68 @@
+"""Tests for the analysis worker."""
+import asyncio
+import pytest
+from app.services.pipeline.analysis_worker import AnalysisWorker
+from app.services.unsafe_scan import scan_unsafe_blocks
+
+
+@pytest.fixture
+def worker() -> AnalysisWorker:
+    """Worker that is never started; only its helpers are exercised."""
+    return AnalysisWorker(asyncio.Queue())
+
+
+class TestMockAnalysis:
+    """Test cases for AnalysisWorker._generate_mock_analysis."""
+    
+    def test_generate_mock_analysis_runs_scan(self, worker):
+        """Test the async wrapper returns the scan's blocks."""
+        code = "unsafe { a() }"
+        
+        blocks = asyncio.run(worker._generate_mock_analysis(code))
+        
+        assert blocks == scan_unsafe_blocks(code)
+
+
+class TestProgressFlush:
+    """Test the debounced progress writes."""
+    
+    @pytest.fixture
+    def flushes(self, worker, monkeypatch) -> list:
+        """Pending progress handed to each _flush_progress call."""
+        calls = []
+        
+        async def record():
+            worker._progress_flush = None
+            calls.append(dict(worker._pending_progress))
+            worker._pending_progress = {}
+        
+        monkeypatch.setattr(worker, "_flush_progress", record)
+        return calls
+    
+    def test_timer_flush_is_tracked(self, worker, flushes):
+        """Test the timer's flush task is referenced until it finishes."""
+        async def run():
+            worker.report_progress("s1", 10)
+            worker._progress_flush.cancel()
+            worker._start_progress_flush()
+            assert len(worker._flush_tasks) == 1
+            await asyncio.gather(*worker._flush_tasks)
+        
+        asyncio.run(run())
+        
+        assert flushes == [{"s1": 10}]
+        assert not worker._flush_tasks
+    
+    def test_stop_flushes_pending_progress(self, worker, flushes):
+        """Test stop() cancels the timer and writes pending progress once."""
+        async def run():
+            worker.report_progress("s1", 10)
+            worker.report_progress("s2", 20)
+            timer = worker._progress_flush
+            await worker.stop()
+            return timer
+        
+        timer = asyncio.run(run())
+        
+        assert timer.cancelled()
+        assert flushes == [{"s1": 10, "s2": 20}]
@@ -1,4 +1,5 @@
 """Tests for diff_generator service."""
+import difflib
 import pytest
 from app.services.diff_generator import DiffGenerator, DiffResult
 
@@ -198,3 +199,58 @@ class TestDiffGenerator:
         
         assert result.has_changes is True
         assert result.lines_removed > 0
+    
+    def test_diff_result_is_memoized(self, sample_rust_code, sample_safe_rust_code):
+        """Test repeat calls for the same pair reuse the cached result."""
+        first = DiffGenerator.generate_diff_result(sample_rust_code, sample_safe_rust_code)
+        second = DiffGenerator.generate_diff_result(sample_rust_code, sample_safe_rust_code)
+        
+        assert first is second
+        
+        relabeled = DiffGenerator.generate_diff_result(
+            sample_rust_code,
+            sample_safe_rust_code,
+            original_label="before.rs"
+        )
+        assert relabeled is not first
+        assert "before.rs" in relabeled.diff_text
+    
+    def test_large_inputs_are_not_memoized(self, monkeypatch):
+        """Test inputs over the size limit are diffed but never cached."""
+        monkeypatch.setattr("app.services.diff_generator.DIFF_CACHE_MAX_INPUT", 16)
+        original = "fn main() {\n    let x = 1;\n}\n"
+        fixed = "fn main() {\n    let x = 2;\n}\n"
+        
+        first = DiffGenerator.generate_diff_result(original, fixed)
+        second = DiffGenerator.generate_diff_result(original, fixed)
+        
+        assert first == second
+        assert first is not second
+    
+    def test_full_rewrite_falls_back_to_difflib(self, monkeypatch):
+        """Test a remediation rewriting a long block skips the quadratic search."""
+        # Pure-Python path, the slow one before MAX_EDIT_DISTANCE
+        monkeypatch.setattr("app.services.myers.Indel", None)
+        fallbacks = []
+        
+        class SpySequenceMatcher(difflib.SequenceMatcher):
+            def __init__(self, *args, **kwargs):
+                fallbacks.append(args)
+                super().__init__(*args, **kwargs)
+        
+        monkeypatch.setattr("app.services.myers.SequenceMatcher", SpySequenceMatcher)
+        original = "".join(
+            f"    let a{i} = buf[{i}];\n" + ("}\n" if i % 5 == 0 else "")
+            for i in range(1500)
+        )
+        fixed = "".join(
+            f"    let b{i} = buf.get({i})?;\n" + ("}\n" if i % 5 == 0 else "")
+            for i in range(1500)
+        )
+        
+        result = DiffGenerator.generate_diff_result(original, fixed)
+        
+        # Far more than MAX_EDIT_DISTANCE edits, so the search gives up
+        assert len(fallbacks) == 1
+        assert result.lines_removed >= 1500
+        assert result.lines_added >= 1500
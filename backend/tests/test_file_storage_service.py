@@ -0,0 +1,49 @@
+"""Tests for file_storage_service."""
+import pytest
+from app.services.file_storage_service import FileStorageService
+
+
+@pytest.fixture
+def storage(tmp_path) -> FileStorageService:
+    """Storage rooted in a per-test temporary directory."""
+    return FileStorageService(base_dir=tmp_path)
+
+
+class TestReadUploadedCode:
+    """Test cases for FileStorageService.read_uploaded_code."""
+    
+    def test_missing_code_returns_none(self, storage):
+        """Test a session without an upload reads as None."""
+        assert storage.read_uploaded_code("missing") is None
+    
+    def test_round_trip(self, storage):
+        """Test saved code reads back unchanged."""
+        storage.save_uploaded_code("s1", "fn main() {}\n")
+        
+        assert storage.read_uploaded_code("s1") == "fn main() {}\n"
+    
+    @pytest.mark.parametrize("mmap_min_size", [1 << 30, 1])
+    def test_crlf_round_trip(self, storage, monkeypatch, mmap_min_size):
+        """Test CRLF and lone CR read back as \\n, buffered or mapped."""
+        monkeypatch.setattr("app.services.file_storage_service.MMAP_MIN_SIZE", mmap_min_size)
+        storage.save_uploaded_code("s1", "fn a() {\r\n unsafe { x() }\r\n}\r\n// old mac\r")
+        
+        assert storage.read_uploaded_code("s1") == "fn a() {\n unsafe { x() }\n}\n// old mac\n"
+    
+    def test_mapped_read_sees_rewrites(self, storage, monkeypatch):
+        """Test reads through mmap reflect a shorter rewrite of the file."""
+        monkeypatch.setattr("app.services.file_storage_service.MMAP_MIN_SIZE", 1)
+        storage.save_uploaded_code("s1", "x" * 20000)
+        assert storage.read_uploaded_code("s1") == "x" * 20000
+        
+        storage.save_uploaded_code("s1", "fn main() {}")
+        
+        assert storage.read_uploaded_code("s1") == "fn main() {}"
+    
+    def test_mapped_read_replaces_invalid_utf8(self, storage, monkeypatch):
+        """Test undecodable bytes become U+FFFD on the mmap path too."""
+        monkeypatch.setattr("app.services.file_storage_service.MMAP_MIN_SIZE", 1)
+        path = storage.get_session_directory("s1") / "uploaded_code.rs"
+        path.write_bytes(b"ok \xff")
+        
+        assert storage.read_uploaded_code("s1") == "ok �"
@@ -1,8 +1,14 @@
 """Tests for LLM service - mock-based unit tests."""
+import difflib
 import pytest
 import json
 from unittest.mock import AsyncMock, patch, MagicMock
 
+from app.services.diff_generator import DiffGenerator
+
+# Parsed once at import; the literal never changes between tests
+PARSED_MOCK_RESPONSE = json.loads('{"vulnerability_type": "CWE-123", "cwe_id": "CWE-123"}')
+
 
 class TestLLMMocks:
     """Test mocks for LLM service behavior without making real API calls."""
@@ -42,50 +48,41 @@ class TestLLMMocks:
     
     def test_mock_json_parsing(self):
         """Test JSON parsing of mock LLM responses."""
-        json_string = '{"vulnerability_type": "CWE-123", "cwe_id": "CWE-123"}'
-        parsed = json.loads(json_string)
+        parsed = PARSED_MOCK_RESPONSE
         
         assert parsed["vulnerability_type"] == "CWE-123"
         assert parsed["cwe_id"] == "CWE-123"
     
     def test_mock_difflib_unified_diff(self):
         """Test using difflib for unified diff without LLM."""
-        import difflib
-        
         original = "line 1\nline 2\nline 3"
         fixed = "line 1\nline 2 modified\nline 3\nline 4"
         
-        diff = list(difflib.unified_diff(
+        diff_text = ''.join(difflib.unified_diff(
             original.splitlines(keepends=True),
             fixed.splitlines(keepends=True),
             fromfile="original",
             tofile="fixed"
         ))
         
-        diff_text = ''.join(diff)
-        
         assert "original" in diff_text
         assert "fixed" in diff_text
         assert "+" in diff_text or "-" in diff_text
     
     def test_mock_diff_result_integration(self):
         """Test integrating diff with mock LLM response."""
-        import difflib
-        
         # Mock LLM response
         mock_original = "fn unsafe() -> i32 { unimplemented!() }"
         mock_fixed = "fn safe() -> Option<i32> { None }"
         
         # Generate diff
-        diff = list(difflib.unified_diff(
+        diff_text = ''.join(difflib.unified_diff(
             mock_original.splitlines(keepends=True),
             mock_fixed.splitlines(keepends=True),
             fromfile="vulnerable_code",
             tofile="remediated_code"
         ))
         
-        diff_text = ''.join(diff)
-        
         # Verify integration works
         assert "vulnerable_code" in diff_text
         assert "remediated_code" in diff_text
@@ -111,8 +108,7 @@ class TestLLMMocks:
             mock_remediation = None
         
         # Step 3: Generate diff
-        import difflib
-        diff = list(difflib.unified_diff(
+        diff = ''.join(difflib.unified_diff(
             mock_analysis.get("code", "original").splitlines(keepends=True),
             mock_remediation.get("fixed_code", "fixed").splitlines(keepends=True) if mock_remediation else [],
             fromfile="vulnerable",
@@ -138,7 +134,6 @@ class TestLLMMocks:
         if mock_analysis.get("vulnerability_type") == "None":
             diff = ""
         else:
-            import difflib
             diff = ''.join(difflib.unified_diff(
                 ["code"],
                 ["fixed"],
@@ -315,8 +310,6 @@ class TestDiffGeneratorIntegration:
     
     def test_diff_with_mock_vulnerable_code(self):
         """Test diff with mock vulnerable code."""
-        from app.services.diff_generator import DiffGenerator
-        
         vulnerable = "fn unsafe_read() { unimplemented!() }"
         fixed = "fn safe_read() -> Result<(), Error> { Ok(()) }"
         
@@ -328,8 +321,6 @@ class TestDiffGeneratorIntegration:
     
     def test_diff_with_mock_safe_code(self):
         """Test diff when code is already safe."""
-        from app.services.diff_generator import DiffGenerator
-        
         safe_code = "fn safe() { println!(\"safe\"); }"
         
         result = DiffGenerator.generate_diff_result(safe_code, safe_code)
@@ -0,0 +1,76 @@
+"""Tests for the Myers line diff."""
+import pytest
+from app.services.myers import MyersMatcher, matching_blocks
+
+
+def apply_opcodes(a, b, opcodes):
+    """Rebuild b from a using the opcodes' equal runs and b's other lines."""
+    result = []
+    for tag, i1, i2, j1, j2 in opcodes:
+        result.extend(a[i1:i2] if tag == 'equal' else b[j1:j2])
+    return result
+
+
+class TestMyers:
+    """Test cases for matching_blocks and MyersMatcher."""
+    
+    @pytest.mark.parametrize("a, b", [
+        ("", ""),
+        ("abc", ""),
+        ("", "abc"),
+        ("abc", "abc"),
+        ("abcabba", "cbabac"),
+        ("xaxbx", "abxx"),
+    ])
+    def test_opcodes_rebuild_target(self, a, b):
+        """Test the opcodes turn a into b."""
+        a, b = list(a), list(b)
+        
+        opcodes = MyersMatcher(a, b).get_opcodes()
+        
+        assert apply_opcodes(a, b, opcodes) == b
+    
+    def test_matching_blocks_are_minimal(self):
+        """Test the classic example keeps a longest common subsequence."""
+        blocks = matching_blocks("abcabba", "cbabac")
+        
+        # LCS length 4 -> 3 deletions and 2 insertions, D = 5
+        assert sum(block.size for block in blocks) == 4
+        assert blocks[-1] == (7, 6, 0)
+    
+    def test_grouped_opcodes_limit_context(self):
+        """Test hunks carry at most n lines of context on each side."""
+        a = [f"line {i}\n" for i in range(20)]
+        b = a[:10] + ["changed\n"] + a[11:]
+        
+        groups = list(MyersMatcher(a, b).get_grouped_opcodes(2))
+        
+        assert groups == [[
+            ('equal', 8, 10, 8, 10),
+            ('replace', 10, 11, 10, 11),
+            ('equal', 11, 13, 11, 13),
+        ]]
+    
+    def test_common_prefix_and_suffix_are_single_blocks(self):
+        """Test unchanged head and tail lines come back as whole blocks."""
+        a = ["head\n"] * 3 + ["old\n"] + ["tail\n"] * 2
+        b = ["head\n"] * 3 + ["new\n", "extra\n"] + ["tail\n"] * 2
+        
+        assert matching_blocks(a, b) == [(0, 0, 3), (4, 5, 2), (6, 7, 0)]
+    
+    @pytest.mark.parametrize("a, b", [
+        ("abcabba", "cbabac"),
+        ("xaxbxcx", "abcxxx"),
+        ("aaaa", "ab"),
+        ("abcd", "acbd"),
+    ])
+    def test_linear_space_variant_is_minimal(self, a, b, monkeypatch):
+        """Test the middle-snake variant keeps as many lines as the plain one."""
+        expected = sum(block.size for block in matching_blocks(a, b))
+        monkeypatch.setattr("app.services.myers.Indel", None)
+        monkeypatch.setattr("app.services.myers.LINEAR_SPACE_THRESHOLD", 0)
+        
+        blocks = matching_blocks(a, b)
+        
+        assert sum(block.size for block in blocks) == expected
+        assert apply_opcodes(list(a), list(b), MyersMatcher(a, b).get_opcodes()) == list(b)
@@ -17,101 +17,264 @@ Run with LLM:
   export LLM_API_KEY=your-key
   python -m pytest tests/test_runner.py -v
 """
+import asyncio
+import hashlib
 import os
 import json
+import re
 import pytest
+from functools import lru_cache
 from pathlib import Path
 
+from app.models.analysis import RiskLevel
+from app.services.diff_generator import DiffGenerator
+from app.services.llm_service import LLMService
 
-def discover_test_cases():
-    """Discover all test cases in test_cases directory."""
+
+def _any_of(*literals: str) -> re.Pattern:
+    """One compiled alternation, so a single scan finds any of the literals."""
+    return re.compile("|".join(map(re.escape, literals)))
+
+
+# Any of these in original.rs marks it as vulnerable
+VULNERABLE_INDICATORS = _any_of(
+    "unwrap()", "expect()", "get_unchecked",
+    "unsafe", "mem::uninitialized", " transmute",
+)
+
+# None of these may remain in fixed.rs
+DANGEROUS_PATTERNS = _any_of(".unwrap()", ".expect(", "get_unchecked")
+
+# Risk levels metadata.json may use, as stored on analyses
+VALID_RISK_LEVELS = frozenset(level.value for level in RiskLevel)
+
+# Digest of the original.rs the saved results were produced for
+RESULT_HASH_FILE = "result_suggestion.hash"
+
+
+@lru_cache(maxsize=None)
+def discover_test_case_dirs() -> tuple[Path, ...]:
+    """Find test case directories without reading any of their files.
+    
+    os.scandir reports entry types from the directory listing itself, so
+    each case costs one listing instead of a stat per checked file.
+    """
     test_cases_dir = Path(__file__).parent / "test_cases"
     
     if not test_cases_dir.exists():
-        return []
-    
-    test_cases = []
-    for subdir in sorted(test_cases_dir.iterdir()):
-        if subdir.is_dir():
-            original_file = subdir / "original.rs"
-            fixed_file = subdir / "fixed.rs"
-            metadata_file = subdir / "metadata.json"
-            
-            if original_file.exists() and fixed_file.exists():
-                metadata = {}
-                if metadata_file.exists():
-                    with open(metadata_file) as f:
-                        metadata = json.load(f)
-                
-                test_cases.append({
-                    "name": subdir.name,
-                    "path": subdir,
-                    "original": original_file.read_text(),
-                    "fixed": fixed_file.read_text(),
-                    "metadata": metadata
-                })
-    
-    return test_cases
-
-
-def run_llm_analysis(original_code: str, test_case: dict) -> tuple[str, str]:
+        return ()
+    
+    test_case_dirs = []
+    with os.scandir(test_cases_dir) as entries:
+        for entry in sorted(entries, key=lambda entry: entry.name):
+            if not entry.is_dir():
+                continue
+            with os.scandir(entry.path) as children:
+                files = {child.name for child in children if child.is_file()}
+            if {"original.rs", "fixed.rs"} <= files:
+                test_case_dirs.append(Path(entry.path))
+    
+    return tuple(test_case_dirs)
+
+
+@lru_cache(maxsize=None)
+def load_test_case(path: Path) -> dict:
+    """Read one test case's files, once per run."""
+    metadata = {}
+    metadata_file = path / "metadata.json"
+    if metadata_file.exists():
+        with open(metadata_file) as f:
+            metadata = json.load(f)
+    
+    return {
+        "name": path.name,
+        "path": path,
+        "original": (path / "original.rs").read_text(),
+        "fixed": (path / "fixed.rs").read_text(),
+        "metadata": metadata
+    }
+
+
+def discover_test_cases():
+    """Discover and load all test cases in test_cases directory."""
+    return [load_test_case(path) for path in discover_test_case_dirs()]
+
+
+def pytest_generate_tests(metafunc):
+    """Parametrize test_case users by directory only; files load on use."""
+    if "test_case_dir" in metafunc.fixturenames:
+        dirs = discover_test_case_dirs()
+        metafunc.parametrize("test_case_dir", dirs, ids=[path.name for path in dirs])
+
+
+@pytest.fixture
+def test_case(test_case_dir: Path) -> dict:
+    """The test case in test_case_dir, read on first use."""
+    return load_test_case(test_case_dir)
+
+
+def llm_enabled() -> bool:
+    """Whether the real LLM API should be called."""
+    return os.environ.get("LLM_ENABLED", "false").lower() == "true"
+
+
+@pytest.fixture(scope="session")
+def llm_runtime():
+    """One LLMService and event loop shared by every LLM test case.
+    
+    Reusing them keeps the HTTP client's connection pool warm across cases
+    instead of building a client and a loop per case.
     """
-    Run LLM analysis on the original code.
+    loop = asyncio.new_event_loop()
+    service = None
+    if llm_enabled():
+        service = LLMService()
+    
+    yield service, loop
+    
+    if service is not None and service.client is not None:
+        loop.run_until_complete(service.client.close())
+    loop.close()
+
+
+def suggestion_and_explanation(pipeline_result) -> tuple[str, str]:
+    """
+    Reduce one analyze_many() result to what is saved for review.
     Returns: (suggested_fix, explanation)
     """
-    # Check if LLM is enabled
-    llm_enabled = os.environ.get("LLM_ENABLED", "false").lower() == "true"
+    if isinstance(pipeline_result, Exception):
+        return "", f"Error: {str(pipeline_result)}"
     
-    if not llm_enabled:
-        return "", "LLM not enabled - set LLM_ENABLED=true to run"
+    remediation = pipeline_result.get("remediation")
+    if remediation is None:
+        return "", "No vulnerability detected"
+    return (
+        remediation.get("fixed_code", ""),
+        remediation.get("explanation", "")
+    )
+
+
+def is_reusable_result(pipeline_result) -> bool:
+    """
+    Whether an analyze_many() result may be reused on later runs.
     
+    Raised pipelines and the service's fallback analysis/remediation
+    (returned when the LLM call or its parsing failed) must be retried.
+    """
+    if isinstance(pipeline_result, Exception):
+        return False
+    analysis = pipeline_result.get("vulnerability_analysis") or {}
+    if analysis.get("vulnerability_type") == "Analysis Error":
+        return False
+    remediation = pipeline_result.get("remediation") or {}
+    return remediation.get("compatibility_notes") != "Remediation generation failed"
+
+
+def source_digest(code: str) -> str:
+    """Stable digest of a case's original code, stored across runs."""
+    return hashlib.blake2b(code.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def load_saved_results(test_case: dict) -> tuple[str, str] | None:
+    """
+    Return the saved results if they were produced for the current
+    original.rs, or None if the LLM has to run again.
+    """
+    test_path = test_case["path"]
     try:
-        import asyncio
-        from app.services.llm_service import LLMService
-        
-        async def get_analysis():
-            service = LLMService()
-            
-            # Analyze vulnerability
-            analysis = await service.analyze_vulnerability(original_code)
-            
-            # If vulnerability found, get remediation
-            if analysis.get("vulnerability_type") != "None":
-                remediation = await service.generate_remediation(original_code, analysis)
-                return (
-                    remediation.get("fixed_code", ""),
-                    remediation.get("explanation", "")
-                )
-            return ("", "No vulnerability detected")
-        
-        # Run async analysis
-        return asyncio.run(get_analysis())
-        
-    except Exception as e:
-        return "", f"Error: {str(e)}"
+        saved_digest = (test_path / RESULT_HASH_FILE).read_text()
+        if saved_digest != source_digest(test_case["original"]):
+            return None
+        return (
+            (test_path / "result_suggestion.rs").read_text(),
+            (test_path / "result_explanation.txt").read_text()
+        )
+    except FileNotFoundError:
+        return None
 
 
-def save_results(test_case: dict, suggestion: str, explanation: str):
-    """Save LLM results to files in the test case directory."""
+@pytest.fixture(scope="session")
+def llm_results(llm_runtime) -> dict[str, tuple[str, str]]:
+    """
+    Run the LLM over every test case concurrently, once per session.
+    
+    Cases are batched through analyze_many, so the run takes about as long
+    as the slowest case instead of the sum of all of them. Cases whose
+    original.rs is unchanged since their last successful run reuse the
+    saved results without an API call. Results are saved next to each case
+    and returned keyed by case name.
+    """
+    service, loop = llm_runtime
+    test_cases = discover_test_cases()
+    results = {}
+    
+    if not llm_enabled():
+        for test_case in test_cases:
+            result = ("", "LLM not enabled - set LLM_ENABLED=true to run")
+            save_results(test_case, *result)
+            results[test_case["name"]] = result
+        return results
+    
+    pending = []
+    for test_case in test_cases:
+        saved = load_saved_results(test_case)
+        if saved is None:
+            pending.append(test_case)
+        else:
+            results[test_case["name"]] = saved
+    
+    pipeline_results = loop.run_until_complete(
+        service.analyze_many([test_case["original"] for test_case in pending])
+    )
+    for test_case, pipeline_result in zip(pending, pipeline_results):
+        result = suggestion_and_explanation(pipeline_result)
+        # Failed calls are saved for review but retried on the next run
+        digest = None
+        if is_reusable_result(pipeline_result):
+            digest = source_digest(test_case["original"])
+        save_results(test_case, *result, digest=digest)
+        results[test_case["name"]] = result
+    
+    return results
+
+
+def write_atomic(path: Path, text: str):
+    """Write text to path via a temporary file and rename.
+    
+    An interrupted run leaves either the old file or the new one in place,
+    never a truncated result.
+    """
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(text)
+    os.replace(tmp_path, path)
+
+
+def save_results(test_case: dict, suggestion: str, explanation: str, digest: str | None = None):
+    """Save LLM results to files in the test case directory.
+    
+    digest (see source_digest) marks the results as reusable for that
+    original.rs; without one, any previous mark is removed.
+    """
     test_path = test_case["path"]
     
+    # Dropped first and written last, so it never vouches for half-saved
+    # results
+    hash_file = test_path / RESULT_HASH_FILE
+    hash_file.unlink(missing_ok=True)
+    
     # Save suggestion
-    suggestion_file = test_path / "result_suggestion.rs"
-    suggestion_file.write_text(suggestion)
+    write_atomic(test_path / "result_suggestion.rs", suggestion)
     
     # Save explanation
-    explanation_file = test_path / "result_explanation.txt"
-    explanation_file.write_text(explanation)
-
-
-# Discover test cases at module load time
-TEST_CASES = discover_test_cases()
+    write_atomic(test_path / "result_explanation.txt", explanation)
+    
+    if digest is not None:
+        write_atomic(hash_file, digest)
 
 
 class TestAgentVulnerabilityDetection:
     """Test vulnerability detection for each test case."""
     
-    @pytest.mark.parametrize("test_case", TEST_CASES, ids=lambda tc: tc["name"])
     def test_vulnerability_detection(self, test_case):
         """Test that agent detects vulnerability in original code."""
         assert test_case["original"] is not None
@@ -119,37 +282,27 @@ class TestAgentVulnerabilityDetection:
         assert test_case["fixed"] is not None
         assert len(test_case["fixed"]) > 0
     
-    @pytest.mark.parametrize("test_case", TEST_CASES, ids=lambda tc: tc["name"])
     def test_original_code_is_vulnerable(self, test_case):
         """Verify original code contains unsafe patterns."""
         original = test_case["original"]
-        vulnerable_indicators = [
-            "unwrap()", "expect()", "get_unchecked",
-            "unsafe", "mem::uninitialized", " transmute",
-        ]
         
-        has_indicator = any(indicator in original for indicator in vulnerable_indicators)
+        has_indicator = bool(VULNERABLE_INDICATORS.search(original))
         is_vulnerable = has_indicator or test_case["metadata"].get("is_vulnerable", True)
         assert is_vulnerable, f"Test case {test_case['name']} should contain vulnerable code"
     
-    @pytest.mark.parametrize("test_case", TEST_CASES, ids=lambda tc: tc["name"])
     def test_fixed_code_is_safe(self, test_case):
         """Verify fixed code doesn't contain dangerous patterns."""
         fixed = test_case["fixed"]
-        dangerous_patterns = [".unwrap()", ".expect(", "get_unchecked"]
         
-        for pattern in dangerous_patterns:
-            assert pattern not in fixed, f"Fixed code should not contain {pattern}"
+        match = DANGEROUS_PATTERNS.search(fixed)
+        assert match is None, f"Fixed code should not contain {match and match.group()}"
 
 
 class TestDiffGeneration:
     """Test diff generation between original and fixed code."""
     
-    @pytest.mark.parametrize("test_case", TEST_CASES, ids=lambda tc: tc["name"])
     def test_diff_generation(self, test_case):
         """Test that diff can be generated between original and fixed."""
-        from app.services.diff_generator import DiffGenerator
-        
         result = DiffGenerator.generate_diff_result(
             test_case["original"],
             test_case["fixed"]
@@ -163,16 +316,10 @@ class TestDiffGeneration:
 class TestLLMIntegration:
     """Test LLM integration - generates result files for human review."""
     
-    @pytest.mark.parametrize("test_case", TEST_CASES, ids=lambda tc: tc["name"])
-    def test_llm_analysis(self, test_case):
+    def test_llm_analysis(self, test_case, llm_results):
         """Run LLM and save results for human review."""
-        suggestion, explanation = run_llm_analysis(
-            test_case["original"],
-            test_case
-        )
-        
-        # Save results to test case directory
-        save_results(test_case, suggestion, explanation)
+        # Computed and saved to the test case directory for all cases at once
+        suggestion, explanation = llm_results[test_case["name"]]
         
         # Verify files were created
         test_path = test_case["path"]
@@ -183,15 +330,13 @@ class TestLLMIntegration:
         assert explanation_file.exists(), "result_explanation.txt should be created"
         
         # If LLM was used, suggestion should not be empty
-        llm_enabled = os.environ.get("LLM_ENABLED", "false").lower() == "true"
-        if llm_enabled:
+        if llm_enabled():
             assert len(suggestion) > 0, "LLM should produce suggestion"
 
 
 class TestMetadataValidation:
     """Test that metadata is properly loaded."""
     
-    @pytest.mark.parametrize("test_case", TEST_CASES, ids=lambda tc: tc["name"])
     def test_metadata_structure(self, test_case):
         """Verify metadata has expected fields if present."""
         metadata = test_case["metadata"]
@@ -201,27 +346,27 @@ class TestMetadataValidation:
                 assert metadata["cwe_id"].startswith("CWE-")
             
             if "risk_level" in metadata:
-                assert metadata["risk_level"] in ["low", "medium", "high", "critical"]
+                assert metadata["risk_level"] in VALID_RISK_LEVELS
 
 
 def test_discover_test_cases():
     """Verify test case discovery works."""
-    assert len(TEST_CASES) >= 0
+    assert len(discover_test_case_dirs()) >= 0
 
 
 if __name__ == "__main__":
-    print(f"Discovered {len(TEST_CASES)} test cases:")
-    for tc in TEST_CASES:
-        print(f"  - {tc['name']}")
+    test_case_dirs = discover_test_case_dirs()
+    print(f"Discovered {len(test_case_dirs)} test cases:")
+    for path in test_case_dirs:
+        print(f"  - {path.name}")
     
-    if not TEST_CASES:
+    if not test_case_dirs:
         print("\nNo test cases found!")
         print("Create test cases in: tests/test_cases/<name>/")
         print("  - original.rs (vulnerable code)")
         print("  - fixed.rs (expected fixed code)")
     
-    llm_enabled = os.environ.get("LLM_ENABLED", "false").lower() == "true"
-    print(f"\nLLM Mode: {'REAL API' if llm_enabled else 'DISABLED (mock)'}")
+    print(f"\nLLM Mode: {'REAL API' if llm_enabled() else 'DISABLED (mock)'}")
     
-    if llm_enabled:
+    if llm_enabled():
         print("⚠️  Running with real LLM API - may incur costs!")
@@ -0,0 +1,166 @@
+"""Tests for the /api/v1/sessions endpoints against the test database."""
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_db, get_db_ro
+from app.services import session_service
+from app.services.file_storage_service import FileStorageService
+
+pytestmark = pytest.mark.asyncio(loop_scope="session")
+
+UNSAFE_CODE = "fn main() {\n    unsafe { f() }\n}\n"
+
+
+@pytest_asyncio.fixture(loop_scope="session")
+async def api_client(test_db, tmp_path, monkeypatch):
+    """HTTP client whose requests run inside test_db's rolled-back transaction.
+    
+    Each request gets its own session on that connection, as it would on
+    the app's engine. Uploaded code is stored under tmp_path instead of the
+    default storage directory.
+    """
+    from app.main import app
+    
+    monkeypatch.setattr(
+        session_service, "FileStorageService", lambda: FileStorageService(tmp_path)
+    )
+    
+    async def override_db():
+        async with AsyncSession(
+            bind=test_db.bind,
+            expire_on_commit=False,
+            join_transaction_mode="create_savepoint",
+        ) as session:
+            yield session
+    
+    app.dependency_overrides[get_db] = override_db
+    app.dependency_overrides[get_db_ro] = override_db
+    try:
+        async with AsyncClient(
+            transport=ASGITransport(app=app),
+            base_url="http://test"
+        ) as client:
+            yield client
+    finally:
+        app.dependency_overrides.clear()
+
+
+class TestCreateSession:
+    """Test POST /sessions."""
+    
+    async def test_small_code_completes_inline(self, api_client):
+        """Test a small upload with the LLM off is analyzed in the request."""
+        response = await api_client.post("/api/v1/sessions", json={"code": UNSAFE_CODE})
+        
+        assert response.status_code == 202
+        created = response.json()
+        assert created["status"] == "completed"
+        assert created["progress"] == 100
+        assert created["created_at"] == created["updated_at"] == created["completed_at"]
+        
+        response = await api_client.get(f"/api/v1/sessions/{created['id']}")
+        
+        assert response.status_code == 200
+        analyses = response.json()["analyses"]
+        assert len(analyses) == 1
+        assert analyses[0]["code_block"]["line_start"] == 2
+
+
+class TestListSessions:
+    """Test GET /sessions."""
+    
+    async def test_lists_newest_first_with_analysis_counts(self, api_client):
+        """Test the streamed JSON array and its per-session analysis counts."""
+        two_blocks = UNSAFE_CODE + "unsafe { g() }\n"
+        first = (await api_client.post("/api/v1/sessions", json={"code": UNSAFE_CODE})).json()
+        second = (await api_client.post("/api/v1/sessions", json={"code": two_blocks})).json()
+        
+        response = await api_client.get("/api/v1/sessions")
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/json"
+        sessions = response.json()
+        assert [s["id"] for s in sessions] == [second["id"], first["id"]]
+        assert [s["analysis_count"] for s in sessions] == [2, 1]
+        assert sessions[0]["status"] == "completed"
+    
+    async def test_status_filter(self, api_client):
+        """Test status_filter drops sessions in other states."""
+        await api_client.post("/api/v1/sessions", json={"code": UNSAFE_CODE})
+        
+        response = await api_client.get("/api/v1/sessions", params={"status_filter": "pending"})
+        
+        assert response.status_code == 200
+        assert response.json() == []
+
+
+class TestUpdateSession:
+    """Test PATCH /sessions/{id}."""
+    
+    @pytest_asyncio.fixture(loop_scope="session")
+    async def session_id(self, api_client) -> str:
+        """Id of a freshly created, completed session."""
+        response = await api_client.post("/api/v1/sessions", json={"code": UNSAFE_CODE})
+        return response.json()["id"]
+    
+    async def test_changed_update(self, api_client, session_id):
+        """Test provided fields are written and completed_at is restamped."""
+        before = (await api_client.get(f"/api/v1/sessions/{session_id}")).json()
+        
+        response = await api_client.patch(
+            f"/api/v1/sessions/{session_id}",
+            json={"status": "failed", "error_message": "boom"}
+        )
+        
+        assert response.status_code == 200
+        assert response.json() == {"message": "Session updated successfully"}
+        after = (await api_client.get(f"/api/v1/sessions/{session_id}")).json()
+        assert after["status"] == "failed"
+        assert after["error_message"] == "boom"
+        assert after["progress"] == 100
+        assert after["completed_at"] > before["completed_at"]
+        assert after["updated_at"] > before["updated_at"]
+    
+    async def test_unchanged_update(self, api_client, session_id):
+        """Test values the row already holds leave it untouched."""
+        before = (await api_client.get(f"/api/v1/sessions/{session_id}")).json()
+        
+        response = await api_client.patch(
+            f"/api/v1/sessions/{session_id}",
+            json={"status": "completed", "progress": 100}
+        )
+        
+        assert response.status_code == 200
+        assert response.json() == {"message": "Session unchanged"}
+        after = (await api_client.get(f"/api/v1/sessions/{session_id}")).json()
+        assert after == before
+    
+    async def test_empty_body(self, api_client, session_id):
+        """Test a body without fields is a no-op."""
+        response = await api_client.patch(f"/api/v1/sessions/{session_id}", json={})
+        
+        assert response.status_code == 200
+        assert response.json() == {"message": "Session unchanged"}
+    
+    @pytest.mark.parametrize("body", [{}, {"progress": 10}])
+    async def test_missing_session(self, api_client, body):
+        """Test unknown ids are a 404 whether or not anything would change."""
+        response = await api_client.patch("/api/v1/sessions/no-such-session", json=body)
+        
+        assert response.status_code == 404
+    
+    async def test_invalidates_status_cache(self, api_client, session_id):
+        """Test a poll right after an update sees it, not the cached status."""
+        status_url = f"/api/v1/sessions/{session_id}/status"
+        assert (await api_client.get(status_url)).json()["progress"] == 100
+        
+        await api_client.patch(
+            f"/api/v1/sessions/{session_id}",
+            json={"status": "processing", "progress": 40}
+        )
+        
+        polled = (await api_client.get(status_url)).json()
+        assert polled["status"] == "processing"
+        assert polled["progress"] == 40
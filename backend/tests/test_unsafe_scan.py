@@ -0,0 +1,62 @@
+"""Tests for the LLM-free unsafe block scan."""
+from app.services.unsafe_scan import scan_unsafe_blocks
+
+
+class TestScanUnsafeBlocks:
+    """Test cases for scan_unsafe_blocks."""
+    
+    def test_no_unsafe_code(self, sample_safe_rust_code):
+        """Test safe code yields no blocks."""
+        assert scan_unsafe_blocks(sample_safe_rust_code) == []
+    
+    def test_finds_block_with_line_numbers(self):
+        """Test a single unsafe block and its 1-based line range."""
+        code = """fn main() {
+    let p = &x as *const i32;
+    unsafe {
+        println!("{}", *p);
+    }
+}"""
+        
+        blocks = scan_unsafe_blocks(code)
+        
+        assert len(blocks) == 1
+        assert blocks[0]["line_start"] == 3
+        assert blocks[0]["line_end"] == 5
+        assert blocks[0]["raw_code"].startswith("unsafe {")
+        assert blocks[0]["raw_code"].endswith("}")
+        assert blocks[0]["analysis_type"] == "non_replaceable"
+    
+    def test_nested_braces(self):
+        """Test braces inside the block don't end it early."""
+        code = "unsafe { if a { b() } else { c() } }\nfn d() {}"
+        
+        blocks = scan_unsafe_blocks(code)
+        
+        assert len(blocks) == 1
+        assert blocks[0]["raw_code"] == "unsafe { if a { b() } else { c() } }"
+    
+    def test_multiple_blocks(self):
+        """Test line numbers stay correct across several blocks."""
+        code = "unsafe { a() }\n\nunsafe {\n b()\n}\n"
+        
+        blocks = scan_unsafe_blocks(code)
+        
+        assert [(b["line_start"], b["line_end"]) for b in blocks] == [(1, 1), (3, 5)]
+    
+    def test_ignores_non_block_unsafe(self):
+        """Test unsafe fns/impls and identifiers containing 'unsafe'."""
+        code = "unsafe fn f() {}\nunsafe impl Send for T {}\nlet is_unsafe = unsafely();"
+        
+        assert scan_unsafe_blocks(code) == []
+    
+    def test_skips_scan_without_unsafe(self, monkeypatch):
+        """Test code without 'unsafe' returns before the regex scan."""
+        class FailingPattern:
+            def search(self, code):
+                raise AssertionError("scan should be skipped")
+        monkeypatch.setattr(
+            "app.services.unsafe_scan._UNSAFE_BLOCK_START", FailingPattern()
+        )
+        
+        assert scan_unsafe_blocks("fn main() {}") == []